@@ -21,6 +21,8 @@ if config.config_file_name is not None:
 
 
 config.set_main_option("sqlalchemy.url", str(get_database_url(settings.database)))
+# Passed to migrations that need it, so that they don't import the settings themselves
+config.attributes["secret_key"] = settings.secret_key.get_secret_value()
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -0,0 +1,75 @@
+"""Store user session token digests
+
+Revision ID: 7c3d9a1e5b48
+Revises: 0b7e4f3a9c21
+Create Date: 2026-10-17 21:48:09.113527
+
+"""
+
+import hashlib
+import hmac
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7c3d9a1e5b48"
+down_revision: Union[str, None] = "0b7e4f3a9c21"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def get_token_digest(token: str, key: str) -> bytes:
+    """Returns the keyed digest of a token, as computed by the application at the time of this revision"""
+
+    return hmac.new(key.encode("utf-8"), token.encode("utf-8"), hashlib.sha256).digest()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("user_sessions", sa.Column("access_token_digest", sa.LargeBinary(length=32), nullable=True))
+    op.add_column("user_sessions", sa.Column("refresh_token_digest", sa.LargeBinary(length=32), nullable=True))
+
+    # Backfill the digests of the existing tokens
+    user_sessions = sa.table(
+        "user_sessions",
+        sa.column("id", sa.Uuid()),
+        sa.column("access_token", sa.String()),
+        sa.column("refresh_token", sa.String()),
+        sa.column("access_token_digest", sa.LargeBinary()),
+        sa.column("refresh_token_digest", sa.LargeBinary()),
+    )
+    connection = op.get_bind()
+    key = op.get_context().config.attributes["secret_key"]
+    rows = connection.execute(
+        sa.select(user_sessions.c.id, user_sessions.c.access_token, user_sessions.c.refresh_token)
+    ).all()
+    for row in rows:
+        connection.execute(
+            user_sessions.update()
+            .where(user_sessions.c.id == row.id)
+            .values(
+                access_token_digest=get_token_digest(row.access_token, key),
+                refresh_token_digest=get_token_digest(row.refresh_token, key),
+            )
+        )
+
+    with op.batch_alter_table("user_sessions") as batch_op:
+        batch_op.alter_column("access_token_digest", existing_type=sa.LargeBinary(length=32), nullable=False)
+        batch_op.alter_column("refresh_token_digest", existing_type=sa.LargeBinary(length=32), nullable=False)
+        batch_op.drop_column("access_token")
+        batch_op.drop_column("refresh_token")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The tokens can't be recovered from their digests, so existing sessions can no longer be verified
+    op.execute(sa.text("DELETE FROM user_sessions"))
+
+    with op.batch_alter_table("user_sessions") as batch_op:
+        batch_op.add_column(sa.Column("access_token", sa.String(), nullable=False))
+        batch_op.add_column(sa.Column("refresh_token", sa.String(), nullable=False))
+        batch_op.drop_column("access_token_digest")
+        batch_op.drop_column("refresh_token_digest")
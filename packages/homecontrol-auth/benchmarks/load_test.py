@@ -0,0 +1,252 @@
+"""
+Load test of the authentication API (homecontrol_auth.main.app), driven in process over ASGI against a temporary
+SQLite database
+
+A number of concurrent clients each repeatedly perform an operation chosen at random from a weighted mix of logging
+in, verifying, refreshing and logging out. The throughput and latency of each endpoint are summarised as JSON, so that
+results from before and after a change can be compared.
+
+Run from the homecontrol-auth directory with e.g.
+    uv run --with httpx python -m benchmarks.load_test --concurrency 20 --requests 5000 --output before.json
+
+Settings of the service may be overridden with e.g. --setting STATELESS_ACCESS_TOKENS=true. By default login throttling
+is disabled, as every client shares the same IP address.
+"""
+
+import asyncio
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from collections import Counter, defaultdict
+from typing import Any
+
+import httpx
+import sqlalchemy
+from homecontrol_base_api.benchmarking import summarise, write_results
+
+ENDPOINTS = {
+    "login": ("POST", "/login"),
+    "verify": ("GET", "/verify"),
+    "refresh": ("POST", "/refresh"),
+    "logout": ("POST", "/logout"),
+}
+
+PASSWORD = "benchmark-password"
+
+
+def configure_environment(database_path: str, overrides: list[str]) -> dict[str, str]:
+    """Assigns the environment variables the settings of the service are read from
+
+    This must be done before homecontrol_auth is imported, as its settings are loaded on import.
+
+    :param database_path: Path of the SQLite database to use
+    :param overrides: Settings to assign in the form NAME=VALUE, taking precedence over the defaults here
+    :return: The settings that were assigned
+    """
+
+    environment = {
+        "DATABASE__DRIVER": "sqlite+aiosqlite",
+        "DATABASE__NAME": database_path,
+        "SECRET_KEY": "benchmark-secret-key-that-is-at-least-32-bytes",
+        "ACCESS_TOKEN_EXPIRY_SECONDS": "900",
+        "REFRESH_TOKEN_EXPIRY_SECONDS": "86400",
+        "LONG_LIVED_REFRESH_TOKEN_EXPIRY_SECONDS": "2592000",
+        "LOGIN_USERNAME_BURST": "0",
+        "LOGIN_IP_BURST": "0",
+    }
+    for override in overrides:
+        name, value = override.split("=", 1)
+        environment[name.upper()] = value
+    os.environ.update(environment)
+    return environment
+
+
+async def create_schema():
+    """Creates the schema of the database"""
+
+    from homecontrol_base_api.database.core import get_database
+
+    from homecontrol_auth.config import settings
+    from homecontrol_auth.database.core import AuthDatabaseSession
+    from homecontrol_auth.database.models import Base
+
+    async with get_database(AuthDatabaseSession, settings.database) as database:
+        async with database.connect() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+
+async def create_users(count: int) -> list[str]:
+    """Creates enabled users to log in as
+
+    :param count: Number of users to create
+    :return: Usernames of the users
+    """
+
+    from homecontrol_base_api.database.core import get_database
+
+    from homecontrol_auth.config import settings
+    from homecontrol_auth.database.core import AuthDatabaseSession
+    from homecontrol_auth.database.models import UserInDB
+    from homecontrol_auth.schemas.users import UserAccountType
+    from homecontrol_auth.security import hash_password
+
+    usernames = [f"user{i}" for i in range(count)]
+    # Hashed once as it is the same for every user
+    hashed_password = hash_password(PASSWORD)
+
+    async with get_database(AuthDatabaseSession, settings.database) as database:
+        async with database.start_session() as session:
+            await session.users.create_many(
+                [
+                    UserInDB(
+                        username=username,
+                        hashed_password=hashed_password,
+                        account_type=UserAccountType.DEFAULT,
+                        enabled=True,
+                    )
+                    for username in usernames
+                ]
+            )
+    return usernames
+
+
+async def run_client(
+    client: httpx.AsyncClient,
+    username: str,
+    mix: dict[str, float],
+    remaining: list[int],
+    durations: dict[str, list[float]],
+    statuses: dict[str, Counter],
+):
+    """Performs operations as a single client until the requests remaining have run out
+
+    :param client: Client to make requests with, holding the cookies of its session
+    :param username: Username to log in as
+    :param mix: Relative weight of each operation
+    :param remaining: Number of requests remaining, shared between all clients
+    :param durations: Durations of the requests made to each endpoint, to append to
+    :param statuses: Counts of the status codes returned by each endpoint, to update
+    """
+
+    operations, weights = list(mix.keys()), list(mix.values())
+    logged_in = False
+
+    while remaining[0] > 0:
+        remaining[0] -= 1
+
+        # Every other operation requires a session
+        operation = random.choices(operations, weights)[0] if logged_in else "login"
+        method, path = ENDPOINTS[operation]
+        body = {"username": username, "password": PASSWORD, "long_lived": False} if operation == "login" else None
+
+        start = time.perf_counter()
+        response = await client.request(method, path, json=body)
+        durations[operation].append(time.perf_counter() - start)
+        statuses[operation][response.status_code] += 1
+
+        if operation == "login":
+            logged_in = response.is_success
+        elif operation == "logout" or response.status_code == 401:
+            logged_in = False
+            client.cookies.clear()
+
+
+async def run_load_test(args) -> dict[str, Any]:
+    """Runs the load test against the app and returns its results"""
+
+    from homecontrol_auth.main import app
+
+    mix = {operation: float(weight) for operation, weight in (item.split("=", 1) for item in args.mix)}
+
+    durations: dict[str, list[float]] = defaultdict(list)
+    statuses: dict[str, Counter] = defaultdict(Counter)
+    remaining = [args.requests]
+
+    await create_schema()
+    async with app.router.lifespan_context(app):
+        # Created once started so that the password is hashed with the calibrated cost and isn't rehashed on login
+        usernames = await create_users(args.users)
+
+        transport = httpx.ASGITransport(app=app)
+        clients = [httpx.AsyncClient(transport=transport, base_url="http://benchmark") for _ in range(args.concurrency)]
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                run_client(client, usernames[i % len(usernames)], mix, remaining, durations, statuses)
+                for i, client in enumerate(clients)
+            )
+        )
+        elapsed = time.perf_counter() - start
+        for client in clients:
+            await client.aclose()
+
+    endpoints = {}
+    for operation in ENDPOINTS:
+        if not durations[operation]:
+            continue
+        endpoints[operation] = {
+            **summarise(durations[operation]),
+            "requests_per_second": len(durations[operation]) / elapsed,
+            "status_codes": {str(status_code): count for status_code, count in sorted(statuses[operation].items())},
+        }
+
+    return {
+        "elapsed_seconds": elapsed,
+        "requests_per_second": args.requests / elapsed,
+        "endpoints": endpoints,
+    }
+
+
+async def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000, help="Total number of requests to make")
+    parser.add_argument("--concurrency", type=int, default=10, help="Number of clients making requests at once")
+    parser.add_argument("--users", type=int, default=10, help="Number of users for the clients to log in as")
+    parser.add_argument(
+        "--mix",
+        nargs="+",
+        default=["verify=80", "refresh=10", "login=5", "logout=5"],
+        help="Relative weight of each operation in the form OPERATION=WEIGHT (operations: login, verify, refresh and "
+        "logout). Clients without a session always log in.",
+    )
+    parser.add_argument(
+        "--setting", action="append", default=[], help="Setting of the service to assign in the form NAME=VALUE"
+    )
+    parser.add_argument("--output", help="File to write the JSON results to (defaults to stdout)")
+    args = parser.parse_args()
+
+    for item in args.mix:
+        if item.split("=", 1)[0] not in ENDPOINTS:
+            parser.error(f"Unknown operation in mix '{item}'")
+
+    with tempfile.TemporaryDirectory() as directory:
+        environment = configure_environment(os.path.join(directory, "auth.db"), args.setting)
+
+        results = {
+            "benchmark": "load_test",
+            "environment": {
+                "python": sys.version.split()[0],
+                "sqlalchemy": sqlalchemy.__version__,
+                "platform": platform.platform(),
+            },
+            "parameters": {
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "users": args.users,
+                "mix": args.mix,
+                "settings": {
+                    name: value for name, value in environment.items() if name not in ("SECRET_KEY", "DATABASE__NAME")
+                },
+            },
+            **await run_load_test(args),
+        }
+
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,5 +1,7 @@
+from typing import Literal, Optional
+
 from homecontrol_base_api.config.core import DatabaseSettings
-from pydantic import SecretStr
+from pydantic import NonNegativeInt, PositiveFloat, PositiveInt, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -14,5 +16,59 @@ class Settings(BaseSettings):
     refresh_token_expiry_seconds: int
     long_lived_refresh_token_expiry_seconds: int
 
+    # Whether access tokens should carry the user's details so that they can be verified without the database. Logouts
+    # and changes to users are enforced immediately by the instance that made them, and by other instances once they
+    # next load the revocations recorded in the database after the given number of seconds.
+    stateless_access_tokens: bool = False
+    revocation_reload_interval_seconds: PositiveFloat = 30
+
+    # Refresh tokens are only rotated (extending their session) once they have less than this many seconds left before
+    # they expire. Until then refreshing only issues a new access token without writing to the database. When None
+    # refresh tokens are rotated every time.
+    refresh_token_rotation_window_seconds: Optional[float] = None
+
+    # Number of threads to hash and verify passwords on, and the number of further requests that may wait for one
+    # before being rejected with a 503 that asks them to retry after the given number of seconds
+    password_hashing_workers: PositiveInt = 4
+    password_hashing_max_queued: NonNegativeInt = 16
+    password_hashing_retry_after_seconds: int = 1
+
+    # Algorithm to hash new passwords with (argon2id requires the 'argon2' extra). Existing hashes created with a
+    # different algorithm or a lower cost are rehashed when their user next logs in.
+    password_hash_algorithm: Literal["bcrypt", "argon2id"] = "bcrypt"
+    # Number of milliseconds hashing a password should take, the costs below are raised towards this on start but never
+    # lowered (when None they are used as they are). As each instance calibrates on its own hardware, instances sharing
+    # a database should leave this unset and configure the same costs, so that they don't rehash each other's hashes.
+    password_hash_target_ms: Optional[float] = None
+    bcrypt_rounds: int = 12
+    argon2_time_cost: int = 3
+    argon2_memory_cost_kib: int = 65536
+    argon2_parallelism: int = 4
+
+    # Number of login attempts allowed in a burst and per second after it, for each username and for each client IP
+    # address (a burst of 0 disables the limit)
+    login_username_burst: int = 10
+    login_username_per_second: PositiveFloat = 0.2
+    login_ip_burst: int = 30
+    login_ip_per_second: PositiveFloat = 1
+
+    # Maximum number of sessions each user may have, when exceeded by logging in the sessions that expire soonest are
+    # deleted (when None there is no limit)
+    max_sessions_per_user: Optional[PositiveInt] = None
+
+    # Number of seconds between each sweep for expired sessions to delete and the maximum number to delete at once
+    session_sweep_interval_seconds: PositiveFloat = 300
+    session_sweep_batch_size: PositiveInt = 500
+
+    # Maximum number of verified sessions to cache (0 disables the cache) and the maximum number of seconds to cache
+    # each for (entries are removed sooner if their access token expires or their session or user changes)
+    session_cache_size: int = 1024
+    session_cache_ttl_seconds: float = 30
+
+    # Maximum number of audit events that may wait to be written to the database before further ones are dropped (0
+    # disables the audit log) and the maximum number to write at once
+    audit_log_max_queued: int = 10000
+    audit_log_batch_size: PositiveInt = 500
+
 
 settings = Settings()
@@ -0,0 +1,63 @@
+from typing import Optional
+
+from homecontrol_base_api.database.repository import DatabaseRepository
+from sqlalchemy import bindparam, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from homecontrol_auth.database.models import ApiKeyInDB, UserInDB
+
+
+class ApiKeysSession(DatabaseRepository[ApiKeyInDB]):
+    """Handles API keys in the database"""
+
+    _model = ApiKeyInDB
+    _record_name = "API key"
+
+    async def get_by_prefix_with_user(self, prefix: str) -> Optional[tuple[ApiKeyInDB, UserInDB]]:
+        """Returns an API key along with the user it belongs to given its prefix, using a single statement
+
+        :param prefix: Prefix of the API key
+        :return: The API key and its user, or None if there is no API key with the prefix
+        """
+
+        statement = self._cached_statement(
+            "get_by_prefix_with_user",
+            lambda: (
+                select(ApiKeyInDB, UserInDB)
+                .join(UserInDB, UserInDB.id == ApiKeyInDB.user_id)
+                .where(ApiKeyInDB.prefix == bindparam("prefix"))
+            ),
+        )
+        row = (await self._session.execute(statement, {"prefix": prefix})).one_or_none()
+        return None if row is None else tuple(row)
+
+    async def get_all_for_user(self, user_id: str) -> list[ApiKeyInDB]:
+        """Returns all of the API keys of a user from the database
+
+        :param user_id: ID of the user
+        :return: List of the user's API keys
+        """
+
+        statement = self._cached_statement(
+            "get_all_for_user",
+            lambda: select(ApiKeyInDB).where(ApiKeyInDB.user_id == bindparam("user_id")).order_by(ApiKeyInDB.name),
+        )
+        return list((await self._session.execute(statement, {"user_id": self._to_uuid(user_id)})).scalars().all())
+
+    async def delete_for_user(self, api_key_id: str, user_id: str) -> None:
+        """Deletes an API key from the database given its ID and the ID of the user it belongs to
+
+        :param api_key_id: ID of the API key to delete
+        :param user_id: ID of the user the API key belongs to
+        :raises RecordNotFoundError: If the user has no API key with the given ID
+        """
+
+        statement = delete(ApiKeyInDB).where(
+            ApiKeyInDB.id == self._to_uuid(api_key_id), ApiKeyInDB.user_id == self._to_uuid(user_id)
+        )
+
+        async def delete_api_key(session: AsyncSession) -> int:
+            return (await session.execute(statement)).rowcount
+
+        if await self._write(delete_api_key) == 0:
+            raise self._not_found_error(api_key_id)
@@ -0,0 +1,10 @@
+from homecontrol_base_api.database.repository import DatabaseRepository
+
+from homecontrol_auth.database.models import AuditEventInDB
+
+
+class AuditEventsSession(DatabaseRepository[AuditEventInDB]):
+    """Handles audit events in the database"""
+
+    _model = AuditEventInDB
+    _record_name = "audit event"
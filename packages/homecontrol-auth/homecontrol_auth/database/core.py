@@ -2,6 +2,9 @@ from typing import Optional
 
 from homecontrol_base_api.database.core import DatabaseSession
 
+from homecontrol_auth.database.api_keys import ApiKeysSession
+from homecontrol_auth.database.audit_events import AuditEventsSession
+from homecontrol_auth.database.revocations import RevocationsSession
 from homecontrol_auth.database.user_sessions import UserSessionsSession
 from homecontrol_auth.database.users import UsersSession
 
@@ -11,6 +14,9 @@ class AuthDatabaseSession(DatabaseSession):
 
     _users: Optional[UsersSession] = None
     _user_sessions: Optional[UserSessionsSession] = None
+    _api_keys: Optional[ApiKeysSession] = None
+    _audit_events: Optional[AuditEventsSession] = None
+    _revocations: Optional[RevocationsSession] = None
 
     @property
     def users(self) -> UsersSession:
@@ -23,3 +29,21 @@ class AuthDatabaseSession(DatabaseSession):
         if not self._user_sessions:
             self._user_sessions = UserSessionsSession(self._session)
         return self._user_sessions
+
+    @property
+    def api_keys(self) -> ApiKeysSession:
+        if not self._api_keys:
+            self._api_keys = ApiKeysSession(self._session)
+        return self._api_keys
+
+    @property
+    def audit_events(self) -> AuditEventsSession:
+        if not self._audit_events:
+            self._audit_events = AuditEventsSession(self._session)
+        return self._audit_events
+
+    @property
+    def revocations(self) -> RevocationsSession:
+        if not self._revocations:
+            self._revocations = RevocationsSession(self._session)
+        return self._revocations
@@ -1,8 +1,10 @@
 from datetime import datetime
+from typing import Optional
 from uuid import UUID, uuid4
 
+from sqlalchemy import Index
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy.types import Boolean, DateTime, LargeBinary, String, Uuid
+from sqlalchemy.types import Boolean, DateTime, Integer, LargeBinary, String, Uuid
 
 
 class Base(DeclarativeBase):
@@ -25,10 +27,60 @@ class UserSessionInDB(Base):
     """User session in the database"""
 
     __tablename__ = "user_sessions"
+    # Allows the sessions of a user to be found in order of expiry, and those of a user to be found without the expiry
+    __table_args__ = (Index("ix_user_sessions_user_id_expiry_time", "user_id", "expiry_time"),)
 
     id: Mapped[UUID] = mapped_column(Uuid, primary_key=True, default=uuid4)
-    user_id: Mapped[UUID] = mapped_column(Uuid, index=True)
-    access_token: Mapped[str] = mapped_column(String)
-    refresh_token: Mapped[str] = mapped_column(String)
+    user_id: Mapped[UUID] = mapped_column(Uuid)
+    # Keyed digests of the current tokens, so that the tokens themselves are never stored
+    access_token_digest: Mapped[bytes] = mapped_column(LargeBinary(32))
+    refresh_token_digest: Mapped[bytes] = mapped_column(LargeBinary(32))
     long_lived: Mapped[bool] = mapped_column(Boolean)
-    expiry_time: Mapped[datetime] = mapped_column(DateTime)
+    expiry_time: Mapped[datetime] = mapped_column(DateTime, index=True)
+    # Incremented each time the session is refreshed, so that access tokens from earlier versions can be rejected
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1")
+
+
+class ApiKeyInDB(Base):
+    """API key in the database"""
+
+    __tablename__ = "api_keys"
+
+    id: Mapped[UUID] = mapped_column(Uuid, primary_key=True, default=uuid4)
+    user_id: Mapped[UUID] = mapped_column(Uuid, index=True)
+    name: Mapped[str] = mapped_column(String)
+    # Identifies the key so that it can be looked up without its secret
+    prefix: Mapped[str] = mapped_column(String, unique=True, index=True)
+    # Keyed digest of the secret part of the key, so that the key itself is never stored
+    secret_digest: Mapped[bytes] = mapped_column(LargeBinary(32))
+    # Account type requests authenticated with the key are limited to
+    account_type: Mapped[str] = mapped_column(String)
+
+
+class AuditEventInDB(Base):
+    """Audit event in the database"""
+
+    __tablename__ = "audit_events"
+
+    id: Mapped[UUID] = mapped_column(Uuid, primary_key=True, default=uuid4)
+    time: Mapped[datetime] = mapped_column(DateTime, index=True)
+    event_type: Mapped[str] = mapped_column(String)
+    user_id: Mapped[Optional[UUID]] = mapped_column(Uuid, index=True)
+    session_id: Mapped[Optional[UUID]] = mapped_column(Uuid)
+    # Username given when the user isn't known e.g. for a failed login
+    username: Mapped[Optional[str]] = mapped_column(String)
+    client_ip: Mapped[Optional[str]] = mapped_column(String)
+
+
+class RevocationInDB(Base):
+    """Revocation of access tokens in the database, so that other instances can enforce it"""
+
+    __tablename__ = "revocations"
+
+    id: Mapped[UUID] = mapped_column(Uuid, primary_key=True, default=uuid4)
+    # Session whose tokens are revoked, or None when all of the tokens of the user issued before the revocation are
+    session_id: Mapped[Optional[UUID]] = mapped_column(Uuid)
+    user_id: Mapped[Optional[UUID]] = mapped_column(Uuid)
+    # Version below which the tokens of the session are revoked (None when all of them are)
+    min_version: Mapped[Optional[int]] = mapped_column(Integer)
+    revoked_at: Mapped[datetime] = mapped_column(DateTime, index=True)
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from homecontrol_base_api.database.repository import DatabaseRepository
+from sqlalchemy import bindparam, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from homecontrol_auth.database.models import RevocationInDB
+
+
+class RevocationsSession(DatabaseRepository[RevocationInDB]):
+    """Handles revocations of access tokens in the database"""
+
+    _model = RevocationInDB
+    _record_name = "revocation"
+
+    async def get_all_since(self, datetime_value: datetime) -> list[RevocationInDB]:
+        """Returns all of the revocations made at or after the given time
+
+        :param datetime_value: Date and time from which to return revocations
+        :return: List of the revocations
+        """
+
+        statement = self._cached_statement(
+            "get_all_since",
+            lambda: select(RevocationInDB).where(RevocationInDB.revoked_at >= bindparam("revoked_at")),
+        )
+        return list((await self._session.execute(statement, {"revoked_at": datetime_value})).scalars().all())
+
+    async def delete_before(self, datetime_value: datetime) -> int:
+        """Deletes all of the revocations made before the given time using a single statement
+
+        :param datetime_value: Date and time before which revocations should be deleted
+        :return: Number of revocations deleted
+        """
+
+        statement = delete(RevocationInDB).where(RevocationInDB.revoked_at < datetime_value)
+
+        async def delete_revocations(session: AsyncSession) -> int:
+            return (await session.execute(statement)).rowcount
+
+        return await self._write(delete_revocations)
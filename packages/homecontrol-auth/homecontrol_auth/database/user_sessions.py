@@ -1,79 +1,146 @@
 from datetime import datetime
+from typing import Any, Optional
 from uuid import UUID
 
-from homecontrol_base_api.database.core import DatabaseSession
-from homecontrol_base_api.exceptions import RecordNotFoundError
-from sqlalchemy import delete
-from sqlalchemy import exc as sqlalchemy_exc
-from sqlalchemy import select
+from homecontrol_base_api.database.repository import DatabaseRepository
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from homecontrol_auth.database.models import UserSessionInDB
+from homecontrol_auth.database.models import UserInDB, UserSessionInDB
 
 
-class UserSessionsSession(DatabaseSession):
+class UserSessionsSession(DatabaseRepository[UserSessionInDB]):
     """Handles user sessions in the database"""
 
-    async def create(self, user_session: UserSessionInDB) -> UserSessionInDB:
-        """Creates a user session in the database
+    _model = UserSessionInDB
+    _record_name = "user session"
 
-        :param user_session: User session to create
-        :return: Created user session
+    async def get_all_for_user(self, user_id: str) -> list[UserSessionInDB]:
+        """Returns all of the sessions of a user from the database
+
+        :param user_id: ID of the user
+        :return: List of the user's sessions
+        """
+
+        statement = self._cached_statement(
+            "get_all_for_user",
+            lambda: (
+                select(UserSessionInDB)
+                .where(UserSessionInDB.user_id == bindparam("user_id"))
+                .order_by(UserSessionInDB.expiry_time)
+            ),
+        )
+        return list((await self._session.execute(statement, {"user_id": self._to_uuid(user_id)})).scalars().all())
+
+    async def delete_all_for_user(self, user_id: str) -> int:
+        """Deletes all of the sessions of a user from the database using a single statement
+
+        :param user_id: ID of the user
+        :return: Number of sessions deleted
         """
 
-        self._session.add(user_session)
-        await self._session.commit()
-        await self._session.refresh(user_session)
-        return user_session
+        statement = delete(UserSessionInDB).where(UserSessionInDB.user_id == self._to_uuid(user_id))
 
-    async def get(self, session_id: str) -> UserSessionInDB:
-        """Returns a user session from the database given its ID
+        async def delete_user_sessions(session: AsyncSession) -> int:
+            return (await session.execute(statement)).rowcount
 
-        :param session_id: ID of the user session to get
-        :return: The user session
-        :raises RecordNotFoundError: If the user session with the given ID is not found in the database
-        """
+        return await self._write(delete_user_sessions)
 
-        try:
-            return (
-                await self._session.execute(select(UserSessionInDB).where(UserSessionInDB.id == UUID(session_id)))
-            ).scalar_one()
-        except (sqlalchemy_exc.NoResultFound, ValueError) as exc:
-            raise RecordNotFoundError(f"No user session found with the ID '{session_id}'") from exc
+    async def create_and_evict_oldest(
+        self, user_session: UserSessionInDB, max_sessions: int
+    ) -> tuple[UserSessionInDB, list[UUID]]:
+        """Creates a user session and deletes the user's other sessions that expire soonest so that they have no more
+        than a maximum number, in the same transaction
 
-    async def update(self, user_session: UserSessionInDB) -> UserSessionInDB:
-        """Updates a user session by commiting any changes to the database
+        The user's row is locked first, so that concurrent logins by the same user can't each miss the session created
+        by the other and leave the user over the limit.
 
-        :param user_session: User session to update
-        :return: The user session
+        :param user_session: User session to create
+        :param max_sessions: Maximum number of sessions the user may have, including the new one
+        :return: The created user session and the IDs of the sessions deleted
         """
 
-        await self._session.commit()
-        await self._session.refresh(user_session)
-        return user_session
+        lock_user = select(UserInDB.id).where(UserInDB.id == user_session.user_id).with_for_update()
+        insert_user_session = self._insert_operation(user_session)
+        evicted_ids = (
+            select(UserSessionInDB.id)
+            .where(UserSessionInDB.user_id == user_session.user_id, UserSessionInDB.id != user_session.id)
+            .order_by(UserSessionInDB.expiry_time.desc(), UserSessionInDB.id.desc())
+            .offset(max_sessions - 1)
+        )
+
+        async def create_user_session(session: AsyncSession) -> tuple[UserSessionInDB, list[UUID]]:
+            # SQLite doesn't support FOR UPDATE, but only allows one transaction to write at a time so the insert below
+            # already serialises logins (reading first would only risk the write failing as the database is locked)
+            if session.bind.dialect.name != "sqlite":
+                await session.execute(lock_user)
+            created = await insert_user_session(session)
+
+            if session.bind.dialect.delete_returning:
+                statement = (
+                    delete(UserSessionInDB).where(UserSessionInDB.id.in_(evicted_ids)).returning(UserSessionInDB.id)
+                )
+                return created, list((await session.execute(statement)).scalars().all())
+
+            evicted = list((await session.execute(evicted_ids)).scalars().all())
+            if evicted:
+                await session.execute(delete(UserSessionInDB).where(UserSessionInDB.id.in_(evicted)))
+            return created, evicted
+
+        return await self._write(create_user_session)
+
+    async def update_if_refresh_token_matches(
+        self, session_id: str, refresh_token_digest: bytes, values: dict[str, Any]
+    ) -> Optional[UserSessionInDB]:
+        """Updates a user session only if its refresh token is still the given one, using a single statement
+
+        As the check and update are made atomically, only one of any concurrent updates using the same refresh token
+        can succeed.
+
+        :param session_id: ID of the user session to update
+        :param refresh_token_digest: Digest of the refresh token the user session is expected to have
+        :param values: Values to assign to the user session
+        :return: The updated user session, or None if there is no user session with the ID and refresh token
+        """
 
-    async def delete(self, session_id: str) -> None:
-        """Deletes a user session from the database given its ID
+        statement = (
+            update(UserSessionInDB)
+            .where(
+                UserSessionInDB.id == self._to_uuid(session_id),
+                UserSessionInDB.refresh_token_digest == refresh_token_digest,
+            )
+            .values(**values)
+        )
 
-        :param session_id: ID of the session to delete
-        :raises RecordNotFoundError: If the user session with the given ID is not found in the database
-        """
+        async def update_user_session(session: AsyncSession) -> Optional[UserSessionInDB]:
+            if session.bind.dialect.update_returning:
+                return (await session.execute(statement.returning(UserSessionInDB))).scalar_one_or_none()
 
-        try:
-            result = await self._session.execute(delete(UserSessionInDB).where(UserSessionInDB.id == UUID(session_id)))
-        except ValueError as exc:
-            raise RecordNotFoundError(f"No user session found with the ID '{session_id}'") from exc
+            if (await session.execute(statement)).rowcount == 0:
+                return None
+            return await session.get(UserSessionInDB, self._to_uuid(session_id), populate_existing=True)
 
-        if result.rowcount == 0:
-            raise RecordNotFoundError(f"No user session found with the ID '{session_id}'")
+        return await self._write(update_user_session)
 
-        await self._session.commit()
+    async def delete_expired_before(self, datetime_value: datetime, limit: int) -> int:
+        """Deletes a batch of user sessions from the database that have expired before the given time
 
-    async def delete_all_expired_before(self, datetime_value: datetime) -> int:
-        """Deletes all user sessions from the database that have expired before the given time
+        The batch is limited so that a large backlog of expired sessions doesn't hold the write lock for long.
 
         :param datetime_value: Date and time before which sessions that have expired should be deleted
+        :param limit: Maximum number of sessions to delete
         :return: Number of rows deleted
         """
-        return (
-            await self._session.execute(delete(UserSessionInDB).where(UserSessionInDB.expiry_time < datetime_value))
-        ).rowcount
+
+        expired_ids = (
+            select(UserSessionInDB.id)
+            .where(UserSessionInDB.expiry_time < datetime_value)
+            .limit(limit)
+            .scalar_subquery()
+        )
+        statement = delete(UserSessionInDB).where(UserSessionInDB.id.in_(expired_ids))
+
+        async def delete_expired(session: AsyncSession) -> int:
+            return (await session.execute(statement)).rowcount
+
+        return await self._write(delete_expired)
@@ -1,17 +1,19 @@
-from uuid import UUID
-
-from homecontrol_base_api.database.core import DatabaseSession
+from homecontrol_base_api.database.repository import DatabaseRepository
 from homecontrol_base_api.exceptions import DuplicateRecordError, RecordNotFoundError
-from sqlalchemy import delete
+from sqlalchemy import bindparam, delete, func, select, update
 from sqlalchemy import exc as sqlalchemy_exc
-from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
-from homecontrol_auth.database.models import UserInDB
+from homecontrol_auth.database.models import ApiKeyInDB, UserInDB, UserSessionInDB
 
 
-class UsersSession(DatabaseSession):
+class UsersSession(DatabaseRepository[UserInDB]):
     """Handles users in the database"""
 
+    _model = UserInDB
+    _record_name = "user"
+
     async def create(self, user: UserInDB) -> UserInDB:
         """Creates a user in the database
 
@@ -20,27 +22,10 @@ class UsersSession(DatabaseSession):
         :raises DuplicateRecordError: If a user with the same username already exists
         """
 
-        self._session.add(user)
         try:
-            await self._session.commit()
+            return await super().create(user)
         except sqlalchemy_exc.IntegrityError as exc:
-            await self._session.rollback()
             raise DuplicateRecordError(f"User with username '{user.username}' already exists") from exc
-        await self._session.refresh(user)
-        return user
-
-    async def get(self, user_id: str) -> UserInDB:
-        """Returns a user from the database given its ID
-
-        :param user_id: ID of the user to get
-        :return: The user
-        :raises RecordNotFoundError: If the user with the given ID is not found in the database
-        """
-
-        try:
-            return (await self._session.execute(select(UserInDB).where(UserInDB.id == UUID(user_id)))).scalar_one()
-        except (sqlalchemy_exc.NoResultFound, ValueError) as exc:
-            raise RecordNotFoundError(f"No user found with the ID '{user_id}'") from exc
 
     async def get_by_username(self, username: str) -> UserInDB:
         """Returns a user from the database given their username
@@ -50,8 +35,11 @@ class UsersSession(DatabaseSession):
         :raises RecordNotFoundError: If a user with the given username is not found in the database
         """
 
+        statement = self._cached_statement(
+            "get_by_username", lambda: select(UserInDB).where(UserInDB.username == bindparam("username"))
+        )
         try:
-            return (await self._session.execute(select(UserInDB).where(UserInDB.username == username))).scalar_one()
+            return (await self._session.execute(statement, {"username": username})).scalar_one()
         except sqlalchemy_exc.NoResultFound:
             raise RecordNotFoundError(f"No user found with the username '{username}'")
 
@@ -63,37 +51,49 @@ class UsersSession(DatabaseSession):
 
         return (await self._session.execute(select(func.count()).select_from(UserInDB))).scalar_one()
 
-    async def get_all(self) -> list[UserInDB]:
-        """Returns a list of users
+    async def update_and_delete_sessions(self, user: UserInDB) -> int:
+        """Commits any changes to a user and deletes all of their sessions in the same transaction
 
-        :return: List of users
+        :param user: User to update
+        :return: Number of sessions deleted
         """
 
-        return (await self._session.execute(select(UserInDB))).scalars().all()
+        changed_values = self._changed_values(user)
+        user_statement = update(UserInDB).where(UserInDB.id == user.id).values(changed_values)
+        sessions_statement = delete(UserSessionInDB).where(UserSessionInDB.user_id == user.id)
 
-    async def update(self, user: UserInDB) -> UserInDB:
-        """Updates a user by commiting any changes to the database
+        async def update_user(session: AsyncSession) -> int:
+            if changed_values:
+                await session.execute(user_statement)
+            return (await session.execute(sessions_statement)).rowcount
 
-        :param user: User to update
-        :return: The user
-        """
+        # The statement writes the changes, so mark them as committed so that the session doesn't also flush them (done
+        # here rather than in the operation, as it may be performed using the session of a writer that doesn't own the
+        # user)
+        for key, value in changed_values.items():
+            set_committed_value(user, key, value)
 
-        await self._session.commit()
-        await self._session.refresh(user)
-        return user
+        return await self._write(update_user)
 
-    async def delete(self, user_id: str) -> None:
-        """Deletes a user from the database given its ID
+    async def delete_with_credentials(self, user_id: str) -> int:
+        """Deletes a user along with all of their sessions and API keys from the database in the same transaction
 
         :param user_id: ID of the user to delete
+        :return: Number of sessions deleted
+        :raises RecordNotFoundError: If the user with the given ID is not found in the database
         """
 
-        try:
-            result = await self._session.execute(delete(UserInDB).where(UserInDB.id == UUID(user_id)))
-        except ValueError as exc:
-            raise RecordNotFoundError(f"No user found with the ID '{user_id}'") from exc
+        user_uuid = self._to_uuid(user_id)
+        sessions_statement = delete(UserSessionInDB).where(UserSessionInDB.user_id == user_uuid)
+        api_keys_statement = delete(ApiKeyInDB).where(ApiKeyInDB.user_id == user_uuid)
+        user_statement = delete(UserInDB).where(UserInDB.id == user_uuid)
 
-        if result.rowcount == 0:
-            raise RecordNotFoundError(f"No user found with the ID '{user_id}'")
+        async def delete_user(session: AsyncSession) -> tuple[int, int]:
+            sessions_deleted = (await session.execute(sessions_statement)).rowcount
+            await session.execute(api_keys_statement)
+            return (await session.execute(user_statement)).rowcount, sessions_deleted
 
-        await self._session.commit()
+        users_deleted, sessions_deleted = await self._write(delete_user)
+        if users_deleted == 0:
+            raise self._not_found_error(user_id)
+        return sessions_deleted
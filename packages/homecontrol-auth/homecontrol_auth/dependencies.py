@@ -1,21 +1,40 @@
-from typing import Annotated, AsyncGenerator
+from typing import Annotated, AsyncGenerator, Optional
 
-from fastapi import Cookie, Depends
+from fastapi import Cookie, Depends, Header, Request
 
 from homecontrol_auth.exceptions import AuthenticationError, InsufficientPrivilegesError
-from homecontrol_auth.schemas.user_sessions import UserSession
+from homecontrol_auth.schemas.user_sessions import LoginPost, UserSession
 from homecontrol_auth.schemas.users import User, UserAccountType
 from homecontrol_auth.services.core import AuthService, create_auth_service
 
 
-async def get_auth_service() -> AsyncGenerator[AuthService, None]:
+async def get_auth_service(request: Request) -> AsyncGenerator[AuthService, None]:
     """Creates an instance of the auth service"""
 
-    async with create_auth_service() as service:
+    async with create_auth_service(
+        request.app.state.database,
+        request.app.state.session_cache,
+        request.app.state.revocations,
+        request.app.state.audit_log,
+    ) as service:
+        yield service
+
+
+async def get_read_only_auth_service(request: Request) -> AsyncGenerator[AuthService, None]:
+    """Creates an instance of the auth service that may only be used to read from the database"""
+
+    async with create_auth_service(
+        request.app.state.database,
+        request.app.state.session_cache,
+        request.app.state.revocations,
+        request.app.state.audit_log,
+        read_only=True,
+    ) as service:
         yield service
 
 
 AuthServiceDep = Annotated[AuthService, Depends(get_auth_service)]
+ReadOnlyAuthServiceDep = Annotated[AuthService, Depends(get_read_only_auth_service)]
 
 
 def get_access_token_from_cookie(access_token: Annotated[str, Cookie()] = None) -> str:
@@ -41,16 +60,40 @@ AccessToken = Annotated[str, Depends(get_access_token_from_cookie)]
 RefreshToken = Annotated[str, Depends(get_refresh_token_from_cookie)]
 
 
+# Sessions are verified on the primary database rather than a read replica, so that a session is valid as soon as it
+# is created and no longer valid as soon as it is deleted
 async def verify_current_user_session(auth_service: AuthServiceDep, access_token: AccessToken) -> UserSession:
     """Verifies the current user"""
 
     return await auth_service.verify_session(access_token)
 
 
-async def verify_current_user(auth_service: AuthServiceDep, access_token: AccessToken) -> User:
-    """Verifies the current user"""
+# Also verified on the primary database, so that deleted API keys and sessions stop authenticating immediately
+async def verify_current_user(
+    auth_service: AuthServiceDep,
+    api_key: Annotated[Optional[str], Header(alias="X-API-Key")] = None,
+    access_token: Annotated[Optional[str], Cookie()] = None,
+) -> User:
+    """Verifies the current user using either an API key or an access token"""
+
+    if api_key is not None:
+        return await auth_service.api_keys.verify(api_key)
+    return await auth_service.verify(get_access_token_from_cookie(access_token))
+
+
+def get_client_ip(request: Request) -> Optional[str]:
+    """Returns the IP address of the client making the request (if known)"""
+
+    return request.client.host if request.client else None
+
+
+ClientIP = Annotated[Optional[str], Depends(get_client_ip)]
+
+
+def throttle_login(login: LoginPost, request: Request, client_ip: ClientIP) -> None:
+    """Rejects a login attempt if too many have been made for its username or from its client recently"""
 
-    return await auth_service.verify(access_token)
+    request.app.state.login_throttle.check(login.username, client_ip)
 
 
 def _create_verify_user_type_dep(valid_account_type: UserAccountType):
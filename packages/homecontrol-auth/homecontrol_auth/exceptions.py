@@ -12,3 +12,29 @@ class InsufficientPrivilegesError(BaseAPIError):
     """Raised when attempting to access something with insufficient privileges"""
 
     status_code = status.HTTP_403_FORBIDDEN
+
+
+class RetryLaterError(BaseAPIError):
+    """Base class for an error telling the client to retry their request after a number of seconds"""
+
+    def __init__(self, message: str, retry_after_seconds: int):
+        """Initialise
+
+        :param message: Error message
+        :param retry_after_seconds: Number of seconds after which the client may retry
+        """
+
+        super().__init__(message)
+        self.headers = {"Retry-After": str(retry_after_seconds)}
+
+
+class ServiceUnavailableError(RetryLaterError):
+    """Raised when a request can't be handled at the moment as the service is overloaded"""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+class TooManyRequestsError(RetryLaterError):
+    """Raised when a client has made too many requests in a short period of time"""
+
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
@@ -1,36 +1,107 @@
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Response, status
+from fastapi import Depends, FastAPI, Response, status
+from homecontrol_base_api.database.core import get_database
 from homecontrol_base_api.exceptions import BaseAPIError, handle_base_api_error
-
-from homecontrol_auth.dependencies import AnySession, AnyUser, AuthServiceDep, RefreshToken
+from homecontrol_base_api.middleware import record_query_stats
+
+from homecontrol_auth.config import settings
+from homecontrol_auth.database.core import AuthDatabaseSession
+from homecontrol_auth.database.models import AuditEventInDB
+from homecontrol_auth.dependencies import (
+    AdminUser,
+    AnySession,
+    AnyUser,
+    AuthServiceDep,
+    ClientIP,
+    RefreshToken,
+    throttle_login,
+)
 from homecontrol_auth.routers.users import users
-from homecontrol_auth.schemas.user_sessions import LoginPost, UserSession
+from homecontrol_auth.schemas.user_sessions import LoginPost, TokenVerification, UserSession, VerifyBatchPost
 from homecontrol_auth.schemas.users import User
+from homecontrol_auth.security import calibrate_password_hasher_async, password_hashing_pool
+from homecontrol_auth.services.audit import AuditLog
 from homecontrol_auth.services.core import create_auth_service
+from homecontrol_auth.services.revocations import RevocationList, RevocationListReloader
+from homecontrol_auth.services.session_cache import VerifiedSessionCache
+from homecontrol_auth.services.sweeper import SessionSweeper
+from homecontrol_auth.throttling import LoginThrottle
 
 
 @asynccontextmanager
-async def lifespan(_app: FastAPI):
+async def lifespan(app: FastAPI):
     """Used to perform startup actions"""
 
-    # Delete all expired user sessions on start
-    async with create_auth_service() as auth_service:
-        await auth_service.user_sessions.delete_all_expired()
+    if settings.password_hash_target_ms is not None:
+        await calibrate_password_hasher_async(settings.password_hash_target_ms / 1000)
+
+    # Open the database once so that requests share its connection pool
+    async with get_database(AuthDatabaseSession, settings.database) as database:
+        session_cache = VerifiedSessionCache(settings.session_cache_size, settings.session_cache_ttl_seconds)
+        revocations = RevocationList(settings.access_token_expiry_seconds)
+
+        async def write_audit_events(events: list[AuditEventInDB]) -> None:
+            async with database.start_session() as session:
+                await session.audit_events.create_many(events)
+
+        # Write audit events in the background so that recording them doesn't slow down requests
+        audit_log = AuditLog(write_audit_events, settings.audit_log_max_queued, settings.audit_log_batch_size)
+        audit_log.start()
+
+        async def load_revocations() -> None:
+            async with create_auth_service(database, session_cache, revocations, audit_log) as auth_service:
+                await auth_service.revocations.load()
+
+        # Reload the recorded revocations periodically so that those made by other instances are enforced here too
+        revocations_reloader = RevocationListReloader(load_revocations, settings.revocation_reload_interval_seconds)
+        if settings.stateless_access_tokens:
+            await revocations_reloader.start()
+
+        async def delete_expired_sessions() -> int:
+            async with create_auth_service(database, session_cache, revocations, audit_log) as auth_service:
+                sessions_deleted = await auth_service.user_sessions.delete_all_expired(
+                    settings.session_sweep_batch_size
+                )
+                return sessions_deleted + await auth_service.revocations.delete_expired()
+
+        # Delete expired user sessions and revocations of tokens that have since expired on start and then periodically
+        session_sweeper = SessionSweeper(delete_expired_sessions, settings.session_sweep_interval_seconds)
+        session_sweeper.start()
+
+        app.state.database = database
+        app.state.session_cache = session_cache
+        app.state.revocations = revocations
+        app.state.audit_log = audit_log
+        app.state.login_throttle = LoginThrottle(
+            settings.login_username_burst,
+            settings.login_username_per_second,
+            settings.login_ip_burst,
+            settings.login_ip_per_second,
+        )
+        app.state.session_sweeper = session_sweeper
+
+        yield
+
+        await session_sweeper.stop()
+        await revocations_reloader.stop()
+        await audit_log.stop()
 
-    yield
+    password_hashing_pool.shutdown()
 
 
 app = FastAPI(lifespan=lifespan)
 
 app.add_exception_handler(BaseAPIError, handle_base_api_error)
+app.middleware("http")(record_query_stats)
 
 app.include_router(users)
 
 
-@app.post("/login", summary="Login as a user")
-async def login(login: LoginPost, response: Response, auth_service: AuthServiceDep) -> UserSession:
-    return await auth_service.user_sessions.create(login, response)
+# Throttled before the auth service is created, so that rejected attempts don't touch the database
+@app.post("/login", summary="Login as a user", dependencies=[Depends(throttle_login)])
+async def login(login: LoginPost, response: Response, auth_service: AuthServiceDep, client_ip: ClientIP) -> UserSession:
+    return await auth_service.user_sessions.create(login, response, client_ip)
 
 
 @app.get("/verify", summary="Check authentication")
@@ -39,10 +110,23 @@ async def verify(user: AnyUser) -> User:
 
 
 @app.post("/refresh", summary="Refresh user session")
-async def refresh(refresh_token: RefreshToken, response: Response, auth_service: AuthServiceDep) -> UserSession:
-    return await auth_service.user_sessions.refresh(refresh_token, response)
+async def refresh(
+    refresh_token: RefreshToken, response: Response, auth_service: AuthServiceDep, client_ip: ClientIP
+) -> UserSession:
+    return await auth_service.user_sessions.refresh(refresh_token, response, client_ip)
 
 
 @app.post("/logout", summary="Logout as a user", status_code=status.HTTP_204_NO_CONTENT)
-async def logout(response: Response, auth_service: AuthServiceDep, user_session: AnySession) -> None:
-    await auth_service.user_sessions.delete(user_session.id, response)
+async def logout(
+    response: Response, auth_service: AuthServiceDep, user_session: AnySession, client_ip: ClientIP
+) -> None:
+    await auth_service.user_sessions.delete(user_session, response, client_ip)
+
+
+# Authenticated as an admin (e.g. using an API key) so that it can't be used to probe tokens anonymously. Verified on
+# the primary database like /verify, so that deleted sessions are rejected immediately.
+@app.post("/verify/batch", summary="Check authentication of many access tokens at once")
+async def verify_batch(
+    verify_batch: VerifyBatchPost, auth_service: AuthServiceDep, _: AdminUser
+) -> list[TokenVerification]:
+    return await auth_service.verify_many(verify_batch.access_tokens)
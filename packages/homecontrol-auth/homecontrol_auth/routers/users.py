@@ -1,6 +1,11 @@
-from fastapi import APIRouter, status
+from typing import Annotated, Optional
 
-from homecontrol_auth.dependencies import AdminUser, AuthServiceDep
+from fastapi import APIRouter, Query, status
+from homecontrol_base_api.responses import NDJSONResponse
+
+from homecontrol_auth.dependencies import AdminUser, AuthServiceDep, ReadOnlyAuthServiceDep
+from homecontrol_auth.schemas.api_keys import ApiKey, ApiKeyPost, ApiKeyWithSecret
+from homecontrol_auth.schemas.user_sessions import UserSession
 from homecontrol_auth.schemas.users import User, UserPatch, UserPost
 
 users = APIRouter(prefix="/users", tags=["users"])
@@ -12,8 +17,25 @@ async def create(user: UserPost, auth_service: AuthServiceDep) -> User:
 
 
 @users.get("", summary="Get a list of users")
-async def get_all(auth_service: AuthServiceDep, _: AdminUser) -> list[User]:
-    return await auth_service.users.get_all()
+async def get_all(
+    auth_service: ReadOnlyAuthServiceDep,
+    _: AdminUser,
+    limit: Annotated[Optional[int], Query(gt=0, le=1000)] = None,
+    after: Optional[str] = None,
+) -> list[User]:
+    if limit is None:
+        return await auth_service.users.get_all()
+    return await auth_service.users.get_page(limit, after)
+
+
+@users.get(
+    "/stream",
+    summary="Stream all users as newline delimited JSON",
+    response_class=NDJSONResponse,
+    responses={200: {"content": {NDJSONResponse.media_type: {}}}},
+)
+async def stream_all(auth_service: ReadOnlyAuthServiceDep, _: AdminUser) -> NDJSONResponse:
+    return NDJSONResponse(auth_service.users.stream_all())
 
 
 @users.patch("/{user_id}", summary="Update a user")
@@ -24,3 +46,30 @@ async def patch(user_id: str, user_patch: UserPatch, auth_service: AuthServiceDe
 @users.delete("/{user_id}", summary="Delete a user", status_code=status.HTTP_204_NO_CONTENT)
 async def delete(user_id: str, auth_service: AuthServiceDep, _: AdminUser) -> None:
     await auth_service.users.delete(user_id)
+
+
+@users.get("/{user_id}/sessions", summary="Get a list of a user's sessions")
+async def get_sessions(user_id: str, auth_service: ReadOnlyAuthServiceDep, _: AdminUser) -> list[UserSession]:
+    return await auth_service.user_sessions.get_all_for_user(user_id)
+
+
+@users.delete("/{user_id}/sessions", summary="Revoke all of a user's sessions", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_sessions(user_id: str, auth_service: AuthServiceDep, _: AdminUser) -> None:
+    await auth_service.user_sessions.delete_all_for_user(user_id)
+
+
+@users.post("/{user_id}/api_keys", summary="Create an API key for a user", status_code=status.HTTP_201_CREATED)
+async def create_api_key(
+    user_id: str, api_key_post: ApiKeyPost, auth_service: AuthServiceDep, _: AdminUser
+) -> ApiKeyWithSecret:
+    return await auth_service.api_keys.create(user_id, api_key_post)
+
+
+@users.get("/{user_id}/api_keys", summary="Get a list of a user's API keys")
+async def get_api_keys(user_id: str, auth_service: ReadOnlyAuthServiceDep, _: AdminUser) -> list[ApiKey]:
+    return await auth_service.api_keys.get_all_for_user(user_id)
+
+
+@users.delete("/{user_id}/api_keys/{api_key_id}", summary="Revoke an API key", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_api_key(user_id: str, api_key_id: str, auth_service: AuthServiceDep, _: AdminUser) -> None:
+    await auth_service.api_keys.delete(user_id, api_key_id)
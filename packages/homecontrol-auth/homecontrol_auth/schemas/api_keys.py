@@ -0,0 +1,32 @@
+from typing import Optional
+
+from homecontrol_base_api.types import StringUUID
+from pydantic import BaseModel, ConfigDict
+
+from homecontrol_auth.schemas.users import UserAccountType
+
+
+class ApiKey(BaseModel):
+    """Schema for an API key"""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: StringUUID
+    user_id: StringUUID
+    name: str
+    prefix: str
+    account_type: UserAccountType
+
+
+class ApiKeyWithSecret(ApiKey):
+    """Schema for an API key that has just been created, the only time the full key is available"""
+
+    key: str
+
+
+class ApiKeyPost(BaseModel):
+    """Schema for creating an API key"""
+
+    name: str
+    # Defaults to the account type of the user
+    account_type: Optional[UserAccountType] = None
@@ -1,9 +1,10 @@
 from datetime import datetime
+from typing import Annotated, Optional
 
 from homecontrol_base_api.types import StringUUID
-from pydantic import BaseModel, ConfigDict, SecretStr
+from pydantic import BaseModel, ConfigDict, Field, SecretStr
 
-from homecontrol_auth.schemas.users import UserPost
+from homecontrol_auth.schemas.users import User, UserPost
 
 
 class LoginPost(UserPost):
@@ -30,3 +31,21 @@ class InternalUserSession(UserSession):
     refresh_token: SecretStr
     long_lived: bool
     expiry_time: datetime
+
+
+class VerifyBatchPost(BaseModel):
+    """Schema for verifying many access tokens at once"""
+
+    access_tokens: Annotated[list[str], Field(max_length=1000)]
+
+
+class TokenVerification(BaseModel):
+    """Schema for the result of verifying an access token
+
+    Contains the user when the token is valid, otherwise the status code and detail of the error that verifying it
+    alone would have returned.
+    """
+
+    status_code: int
+    user: Optional[User] = None
+    detail: Optional[str] = None
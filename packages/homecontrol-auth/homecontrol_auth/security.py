@@ -1,21 +1,295 @@
-from typing import Any
+import asyncio
+import hashlib
+import hmac
+import logging
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional, TypeVar
 
 import bcrypt
 import jwt
 
-from homecontrol_auth.exceptions import AuthenticationError
+from homecontrol_auth.config import settings
+from homecontrol_auth.exceptions import AuthenticationError, ServiceUnavailableError
+
+logger = logging.getLogger()
+
+T = TypeVar("T")
+
+
+class PasswordHasher(ABC):
+    """Base class for an algorithm used to hash passwords
+
+    The parameters used are stored in each hash, so that hashes created with a different cost can still be verified
+    and identified as needing to be rehashed.
+    """
+
+    # Prefix of the hashes created by the algorithm
+    prefix: bytes
+
+    @abstractmethod
+    def hash(self, password: str) -> bytes:
+        """Returns a hash of the given password using the current parameters"""
+
+    @abstractmethod
+    def verify(self, password: str, hashed_password: bytes) -> bool:
+        """Verifies whether a password matches a hash created by this algorithm"""
+
+    @abstractmethod
+    def needs_rehash(self, hashed_password: bytes) -> bool:
+        """Returns whether a hash created by this algorithm was created using a lower cost than the current one"""
+
+    @abstractmethod
+    def calibrate(self, target_seconds: float) -> None:
+        """Raises the cost of the algorithm so that hashing a password takes close to, without exceeding, the given
+        time on the current hardware (the cost it was created with is the minimum, so it is never lowered)
+        """
+
+
+def _time_hash(hasher: PasswordHasher) -> float:
+    """Returns the number of seconds it takes a hasher to hash a password"""
+
+    start = time.perf_counter()
+    hasher.hash("calibration-password")
+    return time.perf_counter() - start
+
+
+class BcryptHasher(PasswordHasher):
+    """Hashes passwords using bcrypt"""
+
+    prefix = b"$2"
+
+    MAX_ROUNDS = 20
+
+    rounds: int
+
+    def __init__(self, rounds: int = 12):
+        """Initialise
+
+        :param rounds: Log2 of the number of iterations to use
+        """
+
+        self.rounds = rounds
+
+    def __repr__(self) -> str:
+        return f"BcryptHasher(rounds={self.rounds})"
+
+    def hash(self, password: str) -> bytes:
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(self.rounds))
+
+    def verify(self, password: str, hashed_password: bytes) -> bool:
+        return bcrypt.checkpw(password.encode("utf-8"), hashed_password)
+
+    def needs_rehash(self, hashed_password: bytes) -> bool:
+        # Hashes are of the form $2b$<rounds>$<salt and hash>
+        return int(hashed_password.split(b"$")[2]) < self.rounds
+
+    def calibrate(self, target_seconds: float) -> None:
+        # Each additional round doubles the time taken
+        duration = _time_hash(self)
+        while self.rounds < self.MAX_ROUNDS and duration * 2 <= target_seconds:
+            self.rounds += 1
+            duration *= 2
+
+
+class Argon2idHasher(PasswordHasher):
+    """Hashes passwords using argon2id (requires argon2-cffi, installed with the 'argon2' extra)"""
+
+    prefix = b"$argon2id$"
+
+    MAX_TIME_COST = 50
+
+    time_cost: int
+    memory_cost: int
+    parallelism: int
+
+    def __init__(self, time_cost: int, memory_cost: int, parallelism: int):
+        """Initialise
+
+        :param time_cost: Number of iterations to use
+        :param memory_cost: Amount of memory to use in KiB
+        :param parallelism: Number of parallel threads to use
+        """
+
+        # Imported here as it is an optional dependency
+        import argon2
+
+        self._argon2 = argon2
+        self.memory_cost = memory_cost
+        self.parallelism = parallelism
+        self._set_time_cost(time_cost)
+
+    def __repr__(self) -> str:
+        return (
+            f"Argon2idHasher(time_cost={self.time_cost}, memory_cost={self.memory_cost}, "
+            f"parallelism={self.parallelism})"
+        )
+
+    def _set_time_cost(self, time_cost: int):
+        """Assigns the number of iterations to use"""
+
+        self.time_cost = time_cost
+        self._hasher = self._argon2.PasswordHasher(
+            time_cost, self.memory_cost, self.parallelism, type=self._argon2.Type.ID
+        )
+
+    def hash(self, password: str) -> bytes:
+        return self._hasher.hash(password).encode("utf-8")
+
+    def verify(self, password: str, hashed_password: bytes) -> bool:
+        try:
+            return self._hasher.verify(hashed_password, password)
+        except (self._argon2.exceptions.VerificationError, self._argon2.exceptions.InvalidHashError):
+            return False
+
+    def needs_rehash(self, hashed_password: bytes) -> bool:
+        parameters = self._argon2.extract_parameters(hashed_password.decode("utf-8"))
+        return parameters.time_cost < self.time_cost or parameters.memory_cost < self.memory_cost
+
+    def calibrate(self, target_seconds: float) -> None:
+        # The time taken grows linearly with the number of iterations, the memory cost is left as configured
+        duration = _time_hash(self) / self.time_cost
+        self._set_time_cost(max(self.time_cost, min(self.MAX_TIME_COST, int(target_seconds / duration))))
+
+
+def _create_password_hasher() -> PasswordHasher:
+    """Creates the hasher for new passwords given the current settings"""
+
+    if settings.password_hash_algorithm == "argon2id":
+        return Argon2idHasher(
+            time_cost=settings.argon2_time_cost,
+            memory_cost=settings.argon2_memory_cost_kib,
+            parallelism=settings.argon2_parallelism,
+        )
+    return BcryptHasher(rounds=settings.bcrypt_rounds)
+
+
+# Hasher used for new passwords, existing hashes created by other algorithms can still be verified
+password_hasher = _create_password_hasher()
+
+
+def _get_hasher(hashed_password: bytes) -> PasswordHasher:
+    """Returns the hasher that created a hash"""
+
+    if hashed_password.startswith(password_hasher.prefix):
+        return password_hasher
+    if hashed_password.startswith(Argon2idHasher.prefix):
+        return Argon2idHasher(
+            time_cost=settings.argon2_time_cost,
+            memory_cost=settings.argon2_memory_cost_kib,
+            parallelism=settings.argon2_parallelism,
+        )
+    return BcryptHasher()
 
 
 def hash_password(password: str) -> bytes:
     """Returns a hash of the given password"""
 
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+    return password_hasher.hash(password)
 
 
 def verify_password(password: str, hashed_password: bytes) -> bool:
     """Verifies whether a password matches its hash"""
 
-    return bcrypt.checkpw(password.encode("utf-8"), hashed_password)
+    return _get_hasher(hashed_password).verify(password, hashed_password)
+
+
+def password_needs_rehash(hashed_password: bytes) -> bool:
+    """Returns whether a hash was created with a different algorithm or a lower cost than the one used for new
+    passwords
+    """
+
+    return not hashed_password.startswith(password_hasher.prefix) or password_hasher.needs_rehash(hashed_password)
+
+
+def calibrate_password_hasher(target_seconds: float) -> None:
+    """Raises the cost of the hasher used for new passwords towards the given time on the current hardware"""
+
+    password_hasher.calibrate(target_seconds)
+    logger.info("Calibrated password hashing to %s", password_hasher)
+
+
+class PasswordHashingPool:
+    """Bounded pool of threads to hash and verify passwords on, so that doing so doesn't block the event loop
+
+    bcrypt releases the GIL while hashing so the threads are able to run in parallel. Once all threads are busy and
+    the maximum number of calls are waiting for one, further calls are rejected rather than left to pile up.
+    """
+
+    _max_workers: int
+    _max_pending: int
+    _retry_after_seconds: int
+    _executor: Optional[ThreadPoolExecutor] = None
+    # Number of calls that are either running or waiting for a thread
+    _pending: int = 0
+
+    def __init__(self, max_workers: int, max_queued: int, retry_after_seconds: int):
+        """Initialise
+
+        :param max_workers: Number of threads to use
+        :param max_queued: Number of calls that may wait for a thread before further calls are rejected
+        :param retry_after_seconds: Number of seconds rejected clients are asked to wait before retrying
+        """
+
+        self._max_workers = max_workers
+        self._max_pending = max_workers + max_queued
+        self._retry_after_seconds = retry_after_seconds
+
+    async def run(self, function: Callable[..., T], *args: Any) -> T:
+        """Runs a function on one of the threads and returns its result
+
+        :param function: Function to run
+        :param args: Arguments to pass to the function
+        :raises ServiceUnavailableError: If too many calls are already waiting for a thread
+        """
+
+        if self._pending >= self._max_pending:
+            raise ServiceUnavailableError(
+                "Too many requests are waiting for a password to be checked", self._retry_after_seconds
+            )
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self._max_workers, thread_name_prefix="password-hashing")
+
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self):
+        """Waits for any running calls to finish and stops the threads (they are started again if needed)"""
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_hashing_pool = PasswordHashingPool(
+    settings.password_hashing_workers,
+    settings.password_hashing_max_queued,
+    settings.password_hashing_retry_after_seconds,
+)
+
+
+async def hash_password_async(password: str) -> bytes:
+    """Returns a hash of the given password, computing it on the password hashing pool"""
+
+    return await password_hashing_pool.run(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed_password: bytes) -> bool:
+    """Verifies whether a password matches its hash, checking it on the password hashing pool"""
+
+    return await password_hashing_pool.run(verify_password, password, hashed_password)
+
+
+async def calibrate_password_hasher_async(target_seconds: float) -> None:
+    """Calibrates the cost of the hasher used for new passwords, timing it on the password hashing pool"""
+
+    await password_hashing_pool.run(calibrate_password_hasher, target_seconds)
 
 
 def generate_jwt(payload: dict[str, Any], key: str) -> str:
@@ -29,5 +303,26 @@ def verify_jwt(token: str, key: str) -> dict[str, Any]:
 
     try:
         return jwt.decode(jwt=token, key=key, algorithms=["HS256"])
-    except jwt.exceptions.ExpiredSignatureError:
-        raise AuthenticationError("Token has expired")
+    except jwt.exceptions.ExpiredSignatureError as exc:
+        raise AuthenticationError("Token has expired") from exc
+    except jwt.exceptions.InvalidTokenError as exc:
+        raise AuthenticationError("Invalid token") from exc
+
+
+def get_jwt_expiry_time(token: str) -> datetime:
+    """Returns the expiry time of a jwt without verifying it (so should only be used once it has been verified)"""
+
+    payload = jwt.decode(jwt=token, options={"verify_signature": False})
+    return datetime.fromtimestamp(payload["exp"], timezone.utc)
+
+
+def get_token_digest(token: str, key: str) -> bytes:
+    """Returns a fixed size keyed digest of a token, for storing in place of the token itself"""
+
+    return hmac.new(key.encode("utf-8"), token.encode("utf-8"), hashlib.sha256).digest()
+
+
+def verify_token_digest(token: str, digest: bytes, key: str) -> bool:
+    """Verifies whether a token matches a digest returned by get_token_digest, in constant time"""
+
+    return hmac.compare_digest(get_token_digest(token, key), digest)
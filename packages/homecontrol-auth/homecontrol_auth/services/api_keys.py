@@ -0,0 +1,117 @@
+import secrets
+from uuid import uuid4
+
+from pydantic import TypeAdapter
+
+from homecontrol_auth.config import settings
+from homecontrol_auth.database.core import AuthDatabaseSession
+from homecontrol_auth.database.models import ApiKeyInDB
+from homecontrol_auth.exceptions import AuthenticationError, InsufficientPrivilegesError
+from homecontrol_auth.schemas.api_keys import ApiKey, ApiKeyPost, ApiKeyWithSecret
+from homecontrol_auth.schemas.users import User, UserAccountType
+from homecontrol_auth.security import get_token_digest, verify_token_digest
+
+# API keys are of the form 'hck_<prefix>_<secret>'
+API_KEY_TYPE = "hck"
+
+# Built once as building a type adapter is relatively expensive
+_api_keys_adapter = TypeAdapter(list[ApiKey])
+
+
+def _limit_account_type(account_type: str, user_account_type: str) -> UserAccountType:
+    """Returns an account type limited to that of a user, so that a key can never grant more than its user has"""
+
+    return UserAccountType(account_type if user_account_type == UserAccountType.ADMIN else user_account_type)
+
+
+class ApiKeysService:
+    """Service that handles API keys, which authenticate machine clients without logging in"""
+
+    _session: AuthDatabaseSession
+
+    def __init__(self, session: AuthDatabaseSession):
+        self._session = session
+
+    async def create(self, user_id: str, api_key_post: ApiKeyPost) -> ApiKeyWithSecret:
+        """Creates an API key for a user
+
+        :param user_id: ID of the user to create the key for
+        :param api_key_post: Details of the key
+        :return: The created API key, including the key itself which isn't stored so can't be obtained again
+        :raises RecordNotFoundError: If the user is not found
+        :raises InsufficientPrivilegesError: If the key would have a higher account type than the user
+        """
+
+        user = await self._session.users.get(user_id)
+
+        account_type = api_key_post.account_type or user.account_type
+        if _limit_account_type(account_type, user.account_type) != account_type:
+            raise InsufficientPrivilegesError("An API key cannot have a higher account type than its user")
+
+        prefix = secrets.token_hex(8)
+        secret = secrets.token_urlsafe(32)
+        api_key = await self._session.api_keys.create(
+            ApiKeyInDB(
+                id=uuid4(),
+                user_id=user.id,
+                name=api_key_post.name,
+                prefix=prefix,
+                secret_digest=get_token_digest(secret, settings.secret_key.get_secret_value()),
+                account_type=account_type,
+            )
+        )
+
+        return ApiKeyWithSecret(**ApiKey.model_validate(api_key).model_dump(), key=f"{API_KEY_TYPE}_{prefix}_{secret}")
+
+    async def get_all_for_user(self, user_id: str) -> list[ApiKey]:
+        """Returns all of the API keys of a user
+
+        :param user_id: ID of the user
+        :return: List of the user's API keys
+        :raises RecordNotFoundError: If the user is not found
+        """
+
+        # Ensures a missing user is reported as such rather than having no keys
+        await self._session.users.get(user_id)
+
+        return _api_keys_adapter.validate_python(await self._session.api_keys.get_all_for_user(user_id))
+
+    async def delete(self, user_id: str, api_key_id: str) -> None:
+        """Deletes (revokes) an API key of a user
+
+        :param user_id: ID of the user the key belongs to
+        :param api_key_id: ID of the key
+        :raises RecordNotFoundError: If the user has no key with the given ID
+        """
+
+        await self._session.api_keys.delete_for_user(api_key_id, user_id)
+
+    async def verify(self, key: str) -> User:
+        """Verifies a user given an API key
+
+        :param key: API key to authenticate
+        :return: The user the key belongs to, with the account type the key is limited to
+        :raises AuthenticationError: If the key is invalid or its user is disabled
+        """
+
+        key_type, _, remainder = key.partition("_")
+        prefix, _, secret = remainder.partition("_")
+        if key_type != API_KEY_TYPE or not prefix or not secret:
+            raise AuthenticationError("Invalid API key")
+
+        result = await self._session.api_keys.get_by_prefix_with_user(prefix)
+        if result is None:
+            raise AuthenticationError("Invalid API key")
+        api_key, user = result
+
+        if not verify_token_digest(secret, api_key.secret_digest, settings.secret_key.get_secret_value()):
+            raise AuthenticationError("Invalid API key")
+        if not user.enabled:
+            raise AuthenticationError("User is disabled")
+
+        return User(
+            id=user.id,
+            username=user.username,
+            account_type=_limit_account_type(api_key.account_type, user.account_type),
+            enabled=user.enabled,
+        )
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from enum import StrEnum
+from typing import Awaitable, Callable, Optional
+from uuid import UUID, uuid4
+
+from homecontrol_auth.database.models import AuditEventInDB
+
+logger = logging.getLogger()
+
+
+class AuditEventType(StrEnum):
+    """Types of audit event"""
+
+    LOGIN = "login"
+    LOGIN_FAILED = "login_failed"
+    REFRESH = "refresh"
+    REFRESH_FAILED = "refresh_failed"
+    LOGOUT = "logout"
+
+
+@dataclass
+class AuditLogStats:
+    """Metrics recorded by an audit log"""
+
+    recorded: int = 0
+    dropped: int = 0
+    written: int = 0
+    failed: int = 0
+
+
+class AuditLog:
+    """Records audit events, writing them to the database in batches in the background
+
+    Recording an event never waits for the database. When the queue of events waiting to be written is full, further
+    events are dropped and counted instead, so that an overloaded database cannot slow down the requests recording
+    them.
+    """
+
+    _write: Callable[[list[AuditEventInDB]], Awaitable[None]]
+    _batch_size: int
+    _queue: Optional[asyncio.Queue]
+    # Set when there are events to write or the writer should stop
+    _wake: asyncio.Event
+    _stopping: bool = False
+    _task: Optional[asyncio.Task] = None
+    # Number of dropped events that have been logged
+    _dropped_logged: int = 0
+
+    stats: AuditLogStats
+
+    def __init__(self, write: Callable[[list[AuditEventInDB]], Awaitable[None]], max_queued: int, batch_size: int):
+        """Initialise
+
+        :param write: Function that writes a batch of events to the database
+        :param max_queued: Maximum number of events that may wait to be written (when 0 no events are recorded)
+        :param batch_size: Maximum number of events to write at once
+        """
+
+        self._write = write
+        self._batch_size = batch_size
+        self._queue = asyncio.Queue(max_queued) if max_queued > 0 else None
+        self._wake = asyncio.Event()
+        self.stats = AuditLogStats()
+
+    def record(
+        self,
+        event_type: AuditEventType,
+        user_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+        username: Optional[str] = None,
+        client_ip: Optional[str] = None,
+    ) -> None:
+        """Queues an event to be written, dropping it if the queue is full
+
+        :param event_type: Type of the event
+        :param user_id: ID of the user the event concerns (if known)
+        :param session_id: ID of the session the event concerns (if any)
+        :param username: Username given when the user isn't known
+        :param client_ip: IP address of the client (if known)
+        """
+
+        if self._queue is None:
+            return
+
+        event = AuditEventInDB(
+            id=uuid4(),
+            time=datetime.now(timezone.utc),
+            event_type=event_type,
+            user_id=None if user_id is None else UUID(str(user_id)),
+            session_id=None if session_id is None else UUID(str(session_id)),
+            username=username,
+            client_ip=client_ip,
+        )
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.stats.dropped += 1
+            return
+        self.stats.recorded += 1
+        self._wake.set()
+
+    def start(self):
+        """Starts writing events in the background"""
+
+        if self._queue is not None and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Writes any events still queued and stops writing"""
+
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+
+        self._log_dropped()
+
+    def _log_dropped(self):
+        """Logs the number of events dropped since this was last called, if any"""
+
+        if self.stats.dropped > self._dropped_logged:
+            logger.warning(
+                "Dropped %d audit events as the queue was full (%d in total)",
+                self.stats.dropped - self._dropped_logged,
+                self.stats.dropped,
+            )
+            self._dropped_logged = self.stats.dropped
+
+    async def _write_batch(self):
+        """Writes the events currently queued, up to the maximum batch size"""
+
+        batch = []
+        while len(batch) < self._batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+        try:
+            await self._write(batch)
+        except Exception:
+            self.stats.failed += len(batch)
+            logger.exception("Failed to write %d audit events", len(batch))
+            return
+        self.stats.written += len(batch)
+
+    async def _run(self):
+        """Writes events as they are queued until stopped"""
+
+        while not self._stopping:
+            await self._wake.wait()
+            self._wake.clear()
+            # Events queued while writing are written in the next batch
+            while not self._queue.empty():
+                await self._write_batch()
+            self._log_dropped()
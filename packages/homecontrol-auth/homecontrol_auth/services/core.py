@@ -1,13 +1,19 @@
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator, Optional
+from typing import AsyncGenerator, Optional, Union
 
-from homecontrol_base_api.database.core import get_database
+from fastapi import status
+from homecontrol_base_api.database.core import Database
 
 from homecontrol_auth.config import settings
 from homecontrol_auth.database.core import AuthDatabaseSession
 from homecontrol_auth.exceptions import AuthenticationError
-from homecontrol_auth.schemas.user_sessions import UserSession
+from homecontrol_auth.schemas.user_sessions import TokenVerification, UserSession
 from homecontrol_auth.schemas.users import User
+from homecontrol_auth.security import get_jwt_expiry_time, verify_jwt
+from homecontrol_auth.services.api_keys import ApiKeysService
+from homecontrol_auth.services.audit import AuditLog
+from homecontrol_auth.services.revocations import RevocationList, RevocationsService
+from homecontrol_auth.services.session_cache import VerifiedSession, VerifiedSessionCache
 from homecontrol_auth.services.user_sessions import UserSessionsService
 from homecontrol_auth.services.users import UsersService
 
@@ -16,25 +22,82 @@ class AuthService:
     """Service that handles authentication"""
 
     _session: AuthDatabaseSession
+    _session_cache: VerifiedSessionCache
+    _revocations: RevocationList
+    _audit_log: AuditLog
 
     _users: Optional[UsersService] = None
     _user_sessions: Optional[UserSessionsService] = None
-
-    def __init__(self, session: AuthDatabaseSession):
+    _api_keys: Optional[ApiKeysService] = None
+    _revocations_service: Optional[RevocationsService] = None
+
+    def __init__(
+        self,
+        session: AuthDatabaseSession,
+        session_cache: VerifiedSessionCache,
+        revocations: RevocationList,
+        audit_log: AuditLog,
+    ):
         self._session = session
+        self._session_cache = session_cache
+        self._revocations = revocations
+        self._audit_log = audit_log
 
     @property
     def users(self) -> UsersService:
         if not self._users:
-            self._users = UsersService(self._session)
+            self._users = UsersService(self._session, self._session_cache, self.revocations)
         return self._users
 
     @property
     def user_sessions(self) -> UserSessionsService:
         if not self._user_sessions:
-            self._user_sessions = UserSessionsService(self._session)
+            self._user_sessions = UserSessionsService(
+                self._session, self._session_cache, self.revocations, self._audit_log
+            )
         return self._user_sessions
 
+    @property
+    def api_keys(self) -> ApiKeysService:
+        if not self._api_keys:
+            self._api_keys = ApiKeysService(self._session)
+        return self._api_keys
+
+    @property
+    def revocations(self) -> RevocationsService:
+        if not self._revocations_service:
+            self._revocations_service = RevocationsService(self._session, self._revocations)
+        return self._revocations_service
+
+    def _verify_stateless(self, access_token: str) -> VerifiedSession:
+        """Verifies a stateless access token using only its signature, claims and the revocation list
+
+        :param access_token: Access token to authenticate
+        :return: The user session and user described by the token
+        :raises AuthenticationError: If the token is invalid or has been revoked
+        """
+
+        payload = verify_jwt(access_token, settings.secret_key.get_secret_value())
+        if payload.get("type") != "access":
+            raise AuthenticationError("Invalid token")
+
+        try:
+            user_session = UserSession(id=payload["session_id"], user_id=payload["user_id"])
+            user = User(
+                id=payload["user_id"],
+                username=payload["username"],
+                account_type=payload["account_type"],
+                enabled=payload["enabled"],
+            )
+            revoked = self._revocations.is_revoked(user_session.id, user.id, payload["ver"], payload["iat"])
+        except KeyError as exc:
+            # Issued before stateless access tokens were enabled
+            raise AuthenticationError("Invalid token") from exc
+
+        if revoked:
+            raise AuthenticationError("Invalid token")
+        return VerifiedSession(user_session=user_session, user=user)
+
     async def verify_session(self, access_token: str) -> UserSession:
         """Verifies a session given an access token
 
@@ -42,6 +105,13 @@ class AuthService:
         :return: The user
         """
 
+        if settings.stateless_access_tokens:
+            return self._verify_stateless(access_token).user_session
+
+        verified_session = self._session_cache.get(access_token)
+        if verified_session is not None:
+            return verified_session.user_session
+
         return await self.user_sessions.verify(access_token)
 
     async def verify(self, access_token: str) -> User:
@@ -50,19 +120,113 @@ class AuthService:
         :param access_token: Access token to authenticate
         :return: The user
         """
-        user_session = await self.verify_session(access_token)
+
+        if settings.stateless_access_tokens:
+            user = self._verify_stateless(access_token).user
+            if not user.enabled:
+                raise AuthenticationError("User is disabled")
+            return user
+
+        verified_session = self._session_cache.get(access_token)
+        if verified_session is not None:
+            return verified_session.user
+
+        user_session = await self.user_sessions.verify(access_token)
         user = await self.users.get(user_session.user_id)
 
         if not user.enabled:
             raise AuthenticationError("User is disabled")
 
+        self._session_cache.add(
+            access_token, VerifiedSession(user_session=user_session, user=user), get_jwt_expiry_time(access_token)
+        )
         return user
 
+    async def verify_many(self, access_tokens: list[str]) -> list[TokenVerification]:
+        """Verifies the users of many access tokens at once
 
-@asynccontextmanager
-async def create_auth_service() -> AsyncGenerator[AuthService, None]:
-    """Creates an instance of the auth service"""
+        Tokens that aren't cached are verified using a single query for their sessions and another for their users.
+
+        :param access_tokens: Access tokens to authenticate
+        :return: The result of verifying each token, in the same order
+        """
 
-    async with get_database(AuthDatabaseSession, settings.database) as database:
-        async with database.start_session() as session:
-            yield AuthService(session)
+        results: list[Optional[Union[User, AuthenticationError]]] = [None] * len(access_tokens)
+        # Stateless access tokens are verified without the database, so there is nothing to batch
+        if settings.stateless_access_tokens:
+            for i, access_token in enumerate(access_tokens):
+                try:
+                    results[i] = await self.verify(access_token)
+                except AuthenticationError as exc:
+                    results[i] = exc
+            return [self._to_token_verification(result) for result in results]
+
+        # Indexes of the tokens whose sessions aren't cached
+        uncached: list[int] = []
+        for i, access_token in enumerate(access_tokens):
+            verified_session = self._session_cache.get(access_token)
+            if verified_session is not None:
+                results[i] = verified_session.user
+            else:
+                uncached.append(i)
+
+        session_results = await self.user_sessions.verify_many([access_tokens[i] for i in uncached])
+        users = {
+            str(user.id): User.model_validate(user)
+            for user in await self._session.users.get_many(
+                [result.user_id for result in session_results if isinstance(result, UserSession)]
+            )
+        }
+
+        for i, session_result in zip(uncached, session_results, strict=True):
+            if isinstance(session_result, AuthenticationError):
+                results[i] = session_result
+                continue
+
+            user = users.get(session_result.user_id)
+            if user is None:
+                # The user has been deleted since the session was verified
+                results[i] = AuthenticationError("Invalid token")
+            elif not user.enabled:
+                results[i] = AuthenticationError("User is disabled")
+            else:
+                self._session_cache.add(
+                    access_tokens[i],
+                    VerifiedSession(user_session=session_result, user=user),
+                    get_jwt_expiry_time(access_tokens[i]),
+                )
+                results[i] = user
+
+        return [self._to_token_verification(result) for result in results]
+
+    @staticmethod
+    def _to_token_verification(result: Union[User, AuthenticationError]) -> TokenVerification:
+        """Returns the result of verifying a token for a response
+
+        :param result: The user of the token, or the error raised verifying it
+        """
+
+        if isinstance(result, AuthenticationError):
+            return TokenVerification(status_code=result.status_code, detail=str(result))
+        return TokenVerification(status_code=status.HTTP_200_OK, user=result)
+
+
+@asynccontextmanager
+async def create_auth_service(
+    database: Database[AuthDatabaseSession],
+    session_cache: VerifiedSessionCache,
+    revocations: RevocationList,
+    audit_log: AuditLog,
+    read_only: bool = False,
+) -> AsyncGenerator[AuthService, None]:
+    """Creates an instance of the auth service
+
+    :param database: Database to start the session of the service from
+    :param session_cache: Cache of verified sessions shared between instances of the service
+    :param revocations: List of revoked access tokens shared between instances of the service
+    :param audit_log: Log to record audit events in, shared between instances of the service
+    :param read_only: Whether the service will only be used to read from the database
+    """
+
+    async with database.start_session(read_only=read_only) as session:
+        yield AuthService(session, session_cache, revocations, audit_log)
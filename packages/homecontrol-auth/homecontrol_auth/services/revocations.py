@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Iterable, Optional
+from uuid import UUID
+
+from homecontrol_auth.config import settings
+from homecontrol_auth.database.core import AuthDatabaseSession
+from homecontrol_auth.database.models import RevocationInDB
+
+logger = logging.getLogger()
+
+
+class RevocationList:
+    """Tracks revoked access tokens so that stateless access tokens can be rejected without querying the database
+
+    Revocations only need to be held for as long as the tokens they revoke could still be valid, so each is dropped
+    once the lifetime of an access token has passed since it was made. Revocations are recorded in the current process
+    immediately, while those made by other instances are picked up when they are next loaded from the database.
+    """
+
+    _token_lifetime_seconds: float
+    # Session ID -> minimum version of the session's tokens that is still valid (None when the session was deleted)
+    # and the time it was revoked
+    _sessions: dict[str, tuple[Optional[int], float]]
+    # User ID -> time before which tokens issued for the user are revoked
+    _users: dict[str, float]
+
+    def __init__(self, token_lifetime_seconds: float):
+        """Initialise
+
+        :param token_lifetime_seconds: Number of seconds access tokens are valid for
+        """
+
+        self._token_lifetime_seconds = token_lifetime_seconds
+        self._sessions = {}
+        self._users = {}
+
+    def load(self, revocations: Iterable[RevocationInDB]) -> None:
+        """Adds revocations loaded from the database, including those made by other instances
+
+        Revocations may be loaded more than once, as each is kept for whichever revokes the most tokens.
+
+        :param revocations: Revocations to add
+        """
+
+        self._prune()
+        for revocation in revocations:
+            # Stored time doesn't have timezone, but is in UTC
+            revoked_at = revocation.revoked_at.replace(tzinfo=timezone.utc).timestamp()
+            if revocation.session_id is not None:
+                self._add_session(str(revocation.session_id), revocation.min_version, revoked_at)
+            else:
+                self._add_user(str(revocation.user_id), revoked_at)
+
+    def revoke_session(self, session_id: str, min_version: Optional[int], revoked_at: float) -> None:
+        """Revokes the tokens of a session
+
+        :param session_id: ID of the session
+        :param min_version: Version below which tokens are revoked. When None all of its tokens are revoked.
+        :param revoked_at: Time the tokens were revoked as a UNIX timestamp
+        """
+
+        self._prune()
+        self._add_session(str(session_id), min_version, revoked_at)
+
+    def revoke_user(self, user_id: str, revoked_at: float) -> None:
+        """Revokes all tokens issued for a user up to a given time
+
+        :param user_id: ID of the user
+        :param revoked_at: Time up to which tokens are revoked as a UNIX timestamp
+        """
+
+        self._prune()
+        self._add_user(str(user_id), revoked_at)
+
+    def is_revoked(self, session_id: str, user_id: str, version: int, issued_at: float) -> bool:
+        """Returns whether a token has been revoked
+
+        :param session_id: ID of the session the token belongs to
+        :param user_id: ID of the user the token belongs to
+        :param version: Version of the session the token was issued for
+        :param issued_at: Time the token was issued as a UNIX timestamp
+        """
+
+        session_revocation = self._sessions.get(session_id)
+        if session_revocation is not None:
+            min_version, _ = session_revocation
+            if min_version is None or version < min_version:
+                return True
+
+        user_revoked_at = self._users.get(user_id)
+        return user_revoked_at is not None and issued_at <= user_revoked_at
+
+    def _add_session(self, session_id: str, min_version: Optional[int], revoked_at: float) -> None:
+        """Records the revocation of the tokens of a session, merging it with any already recorded"""
+
+        existing = self._sessions.get(session_id)
+        if existing is not None:
+            existing_min_version, existing_revoked_at = existing
+            min_version = (
+                None if min_version is None or existing_min_version is None else max(min_version, existing_min_version)
+            )
+            revoked_at = max(revoked_at, existing_revoked_at)
+        self._sessions[session_id] = (min_version, revoked_at)
+
+    def _add_user(self, user_id: str, revoked_at: float) -> None:
+        """Records the revocation of the tokens of a user, merging it with any already recorded"""
+
+        self._users[user_id] = max(revoked_at, self._users.get(user_id, revoked_at))
+
+    def _prune(self) -> None:
+        """Drops any revocations that are older than the lifetime of a token, as the tokens they revoke have expired"""
+
+        cutoff = time.time() - self._token_lifetime_seconds
+
+        self._sessions = {
+            session_id: revocation for session_id, revocation in self._sessions.items() if revocation[1] >= cutoff
+        }
+        self._users = {user_id: revoked_at for user_id, revoked_at in self._users.items() if revoked_at >= cutoff}
+
+
+class RevocationListReloader:
+    """Periodically loads the revocations recorded in the database into a revocation list in the background, so that
+    sessions deleted or refreshed and users changed by other instances are revoked here too
+    """
+
+    _reload: Callable[[], Awaitable[None]]
+    _interval_seconds: float
+    _task: Optional[asyncio.Task] = None
+
+    def __init__(self, reload: Callable[[], Awaitable[None]], interval_seconds: float):
+        """Initialise
+
+        :param reload: Function that loads the recorded revocations into the revocation list
+        :param interval_seconds: Number of seconds to wait between each reload
+        """
+
+        self._reload = reload
+        self._interval_seconds = interval_seconds
+
+    async def start(self):
+        """Loads the recorded revocations and then starts reloading them periodically"""
+
+        await self._reload()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops reloading, cancelling any reload in progress"""
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        """Reloads until cancelled"""
+
+        while True:
+            await asyncio.sleep(self._interval_seconds)
+            try:
+                await self._reload()
+            except Exception:
+                # Keep the revocations loaded previously and try again at the next interval
+                logger.exception("Failed to reload the revocation list")
+
+
+class RevocationsService:
+    """Service that revokes access tokens
+
+    Revocations are added to the revocation list of this instance immediately. When access tokens are stateless they
+    are also recorded in the database, from where other instances load them.
+    """
+
+    _session: AuthDatabaseSession
+    _revocations: RevocationList
+
+    def __init__(self, session: AuthDatabaseSession, revocations: RevocationList):
+        self._session = session
+        self._revocations = revocations
+
+    async def revoke_sessions(self, session_ids: Iterable[str], min_version: Optional[int] = None) -> None:
+        """Revokes the tokens of sessions
+
+        :param session_ids: IDs of the sessions
+        :param min_version: Version below which tokens are revoked. When None all of their tokens are revoked.
+        """
+
+        session_ids = [str(session_id) for session_id in session_ids]
+        revoked_at = time.time()
+        for session_id in session_ids:
+            self._revocations.revoke_session(session_id, min_version, revoked_at)
+
+        if settings.stateless_access_tokens and session_ids:
+            await self._session.revocations.create_many(
+                [
+                    RevocationInDB(
+                        session_id=UUID(session_id),
+                        min_version=min_version,
+                        revoked_at=datetime.fromtimestamp(revoked_at, timezone.utc),
+                    )
+                    for session_id in session_ids
+                ]
+            )
+
+    async def revoke_user(self, user_id: str) -> None:
+        """Revokes all tokens issued for a user up to now
+
+        :param user_id: ID of the user
+        """
+
+        revoked_at = time.time()
+        self._revocations.revoke_user(user_id, revoked_at)
+
+        if settings.stateless_access_tokens:
+            await self._session.revocations.create(
+                RevocationInDB(
+                    user_id=UUID(str(user_id)),
+                    revoked_at=datetime.fromtimestamp(revoked_at, timezone.utc),
+                )
+            )
+
+    async def load(self) -> None:
+        """Loads the revocations recorded in the database that may still apply to unexpired tokens into the revocation
+        list, so that tokens revoked by other instances are rejected too
+        """
+
+        self._revocations.load(await self._session.revocations.get_all_since(self._get_cutoff()))
+
+    async def delete_expired(self) -> int:
+        """Deletes the revocations recorded in the database whose tokens have all since expired
+
+        :return: Number of revocations deleted
+        """
+
+        return await self._session.revocations.delete_before(self._get_cutoff())
+
+    def _get_cutoff(self) -> datetime:
+        """Returns the time before which revocations no longer apply to any unexpired tokens"""
+
+        return datetime.fromtimestamp(time.time() - settings.access_token_expiry_seconds, timezone.utc)
@@ -0,0 +1,196 @@
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Generic, Optional, TypeVar
+
+from homecontrol_auth.schemas.user_sessions import UserSession
+from homecontrol_auth.schemas.users import User
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Bounded cache whose entries expire after a time to live, evicting the least recently used entry when full"""
+
+    _max_size: int
+    _ttl_seconds: float
+    # Values along with the (monotonic) time they expire at, ordered from least to most recently used
+    _entries: OrderedDict[K, tuple[V, float]]
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        """Initialise
+
+        :param max_size: Maximum number of entries to hold (when 0 nothing is cached)
+        :param ttl_seconds: Maximum number of seconds to hold each entry for
+        """
+
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> Optional[V]:
+        """Returns the value of an entry, or None if it is not present or has expired
+
+        :param key: Key of the entry
+        """
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, expiry_time: Optional[datetime] = None) -> None:
+        """Assigns the value of an entry
+
+        :param key: Key of the entry
+        :param value: Value to assign
+        :param expiry_time: Time after which the entry must no longer be returned, even if its time to live has not
+                            passed. Must be timezone aware.
+        """
+
+        ttl_seconds = self._ttl_seconds
+        if expiry_time is not None:
+            ttl_seconds = min(ttl_seconds, expiry_time.timestamp() - time.time())
+        if self._max_size <= 0 or ttl_seconds <= 0:
+            return
+
+        self._entries[key] = (value, time.monotonic() + ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def delete_where(self, predicate: Callable[[V], bool]) -> int:
+        """Deletes all entries whose values match a predicate
+
+        :param predicate: Function returning whether an entry's value should be deleted
+        :return: Number of entries deleted
+        """
+
+        keys = [key for key, (value, _) in self._entries.items() if predicate(value)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        """Deletes all entries"""
+
+        self._entries.clear()
+
+
+@dataclass(frozen=True)
+class VerifiedSession:
+    """A user session and user that have been verified using an access token"""
+
+    user_session: UserSession
+    user: User
+
+
+@dataclass(frozen=True)
+class RefreshableSession:
+    """A user session whose refresh token has been verified as its current one"""
+
+    session_id: str
+    user_id: str
+    version: int
+    # Only loaded when using stateless access tokens, as it is needed to issue them
+    user: Optional[User]
+
+
+class VerifiedSessionCache:
+    """Caches the results of verifying access and refresh tokens so that repeated requests using the same token avoid
+    the database
+
+    Entries are keyed by a hash of the token so that tokens themselves are not held, and never outlive the expiry of
+    their token. Invalidation only affects the current process, so the time to live bounds how long other instances
+    may continue to accept a session after it has been changed.
+    """
+
+    _cache: TTLCache[str, VerifiedSession]
+    _refreshable_cache: TTLCache[str, RefreshableSession]
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        """Initialise
+
+        :param max_size: Maximum number of verified sessions to hold (when 0 nothing is cached)
+        :param ttl_seconds: Maximum number of seconds to hold each verified session for
+        """
+
+        self._cache = TTLCache(max_size, ttl_seconds)
+        self._refreshable_cache = TTLCache(max_size, ttl_seconds)
+
+    @staticmethod
+    def _key(token: str) -> str:
+        """Returns the key to cache a token under"""
+
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, access_token: str) -> Optional[VerifiedSession]:
+        """Returns the verified session for an access token, or None if it is not cached
+
+        :param access_token: Access token that was verified
+        """
+
+        return self._cache.get(self._key(access_token))
+
+    def add(self, access_token: str, verified_session: VerifiedSession, token_expiry_time: datetime) -> None:
+        """Caches the verified session for an access token
+
+        :param access_token: Access token that was verified
+        :param verified_session: Result of verifying the token
+        :param token_expiry_time: Time at which the access token expires
+        """
+
+        self._cache.set(self._key(access_token), verified_session, token_expiry_time)
+
+    def get_refreshable(self, refresh_token: str) -> Optional[RefreshableSession]:
+        """Returns the verified session for a refresh token, or None if it is not cached
+
+        :param refresh_token: Refresh token that was verified
+        """
+
+        return self._refreshable_cache.get(self._key(refresh_token))
+
+    def add_refreshable(
+        self, refresh_token: str, refreshable_session: RefreshableSession, token_expiry_time: datetime
+    ) -> None:
+        """Caches the verified session for a refresh token
+
+        :param refresh_token: Refresh token that was verified
+        :param refreshable_session: Result of verifying the token
+        :param token_expiry_time: Time at which the refresh token expires
+        """
+
+        self._refreshable_cache.set(self._key(refresh_token), refreshable_session, token_expiry_time)
+
+    def invalidate_session(self, session_id: str) -> None:
+        """Removes any cached entries for a user session
+
+        :param session_id: ID of the user session
+        """
+
+        self._cache.delete_where(lambda verified_session: verified_session.user_session.id == str(session_id))
+        self._refreshable_cache.delete_where(
+            lambda refreshable_session: refreshable_session.session_id == str(session_id)
+        )
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Removes any cached entries for the sessions of a user
+
+        :param user_id: ID of the user
+        """
+
+        self._cache.delete_where(lambda verified_session: verified_session.user.id == str(user_id))
+        self._refreshable_cache.delete_where(lambda refreshable_session: refreshable_session.user_id == str(user_id))
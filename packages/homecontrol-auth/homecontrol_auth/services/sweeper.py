@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger()
+
+
+@dataclass
+class SweepStats:
+    """Metrics recorded by a sweeper"""
+
+    sweeps: int = 0
+    failures: int = 0
+    rows_deleted: int = 0
+    last_rows_deleted: int = 0
+    last_duration_seconds: float = 0
+    total_duration_seconds: float = 0
+
+
+class SessionSweeper:
+    """Periodically deletes expired user sessions in the background"""
+
+    _sweep: Callable[[], Awaitable[int]]
+    _interval_seconds: float
+    _task: Optional[asyncio.Task] = None
+
+    stats: SweepStats
+
+    def __init__(self, sweep: Callable[[], Awaitable[int]], interval_seconds: float):
+        """Initialise
+
+        :param sweep: Function that deletes the expired sessions and returns the number deleted
+        :param interval_seconds: Number of seconds to wait between each sweep
+        """
+
+        self._sweep = sweep
+        self._interval_seconds = interval_seconds
+        self.stats = SweepStats()
+
+    def start(self):
+        """Starts sweeping, the first sweep is performed immediately"""
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops sweeping, cancelling any sweep in progress"""
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def sweep_once(self):
+        """Performs a single sweep and records its metrics"""
+
+        start = time.perf_counter()
+        try:
+            rows_deleted = await self._sweep()
+        except Exception:
+            self.stats.failures += 1
+            logger.exception("Failed to sweep expired user sessions")
+            return
+        duration = time.perf_counter() - start
+
+        self.stats.sweeps += 1
+        self.stats.rows_deleted += rows_deleted
+        self.stats.last_rows_deleted = rows_deleted
+        self.stats.last_duration_seconds = duration
+        self.stats.total_duration_seconds += duration
+        logger.info(
+            "Swept expired user sessions: rows_deleted=%d duration_ms=%.2f total_rows_deleted=%d",
+            rows_deleted,
+            duration * 1000,
+            self.stats.rows_deleted,
+        )
+
+    async def _run(self):
+        """Sweeps until cancelled"""
+
+        while True:
+            await self.sweep_once()
+            await asyncio.sleep(self._interval_seconds)
@@ -1,35 +1,149 @@
 from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, Union
 from uuid import uuid4
 
 from fastapi import Response
 from homecontrol_base_api.exceptions import RecordNotFoundError
+from pydantic import TypeAdapter
 
 from homecontrol_auth.config import settings
 from homecontrol_auth.database.core import AuthDatabaseSession
 from homecontrol_auth.database.models import UserInDB, UserSessionInDB
-from homecontrol_auth.exceptions import AuthenticationError
+from homecontrol_auth.exceptions import AuthenticationError, ServiceUnavailableError
 from homecontrol_auth.schemas.user_sessions import InternalUserSession, LoginPost, UserSession
-from homecontrol_auth.schemas.users import UserAccountType
-from homecontrol_auth.security import generate_jwt, verify_jwt, verify_password
+from homecontrol_auth.schemas.users import User, UserAccountType
+from homecontrol_auth.security import (
+    generate_jwt,
+    get_token_digest,
+    hash_password_async,
+    password_needs_rehash,
+    verify_jwt,
+    verify_password_async,
+    verify_token_digest,
+)
+from homecontrol_auth.services.audit import AuditEventType, AuditLog
+from homecontrol_auth.services.revocations import RevocationsService
+from homecontrol_auth.services.session_cache import RefreshableSession, VerifiedSessionCache
+
+# Built once as building a type adapter is relatively expensive
+_user_sessions_adapter = TypeAdapter(list[UserSession])
 
 
 class UserSessionsService:
     """Service that handles user sessions"""
 
     _session: AuthDatabaseSession
-
-    def __init__(self, session: AuthDatabaseSession):
+    _session_cache: VerifiedSessionCache
+    _revocations: RevocationsService
+    _audit_log: AuditLog
+
+    def __init__(
+        self,
+        session: AuthDatabaseSession,
+        session_cache: VerifiedSessionCache,
+        revocations: RevocationsService,
+        audit_log: AuditLog,
+    ):
         self._session = session
+        self._session_cache = session_cache
+        self._revocations = revocations
+        self._audit_log = audit_log
+
+    def _get_expiry_time(self, long_lived: bool, current_time: datetime) -> datetime:
+        """Returns the time at which a session (and its refresh token) issued at the given time should expire
+
+        :param long_lived: Whether the session is long lived or not
+        :param current_time: Time the session is being issued or refreshed at
+        """
+
+        return current_time + timedelta(
+            seconds=(
+                settings.long_lived_refresh_token_expiry_seconds
+                if long_lived
+                else settings.refresh_token_expiry_seconds
+            )
+        )
+
+    def _generate_refresh_token(
+        self, session_id: str, user_id: str, long_lived: bool, version: int, expiry_time: datetime
+    ) -> str:
+        """Generates and returns a refresh token
 
-    def _generate_token(self, session_id: str, expiry_time: datetime) -> str:
-        """Generates and returns an access token
+        The token carries the details of the session needed to refresh it, so that refreshing doesn't need to read the
+        session first.
+
+        :param session_id: ID of the session the refresh token should be generated for
+        :param user_id: ID of the user the session belongs to
+        :param long_lived: Whether the session is long lived or not
+        :param version: Version of the session the token is being issued for
+        :param expiry_time: Time at which the token should expire
+        :return: The generated refresh token
+        """
+
+        return generate_jwt(
+            payload={
+                "type": "refresh",
+                "session_id": str(session_id),
+                "user_id": str(user_id),
+                "long_lived": long_lived,
+                "ver": version,
+                "exp": expiry_time,
+            },
+            key=settings.secret_key.get_secret_value(),
+        )
+
+    def _generate_access_token(
+        self, session_id: str, version: int, user: Optional[Union[UserInDB, User]], current_time: datetime
+    ) -> str:
+        """Generates and returns an access token for a user session
+
+        The token carries the version of the session it was issued for, so that it is no longer valid once the
+        session is refreshed. When using stateless access tokens it also carries the claims required to verify it
+        without the database.
 
         :param session_id: ID of the session the access token should be generated for
+        :param version: Version of the session the token is being issued for
+        :param user: User the session belongs to (only required when using stateless access tokens)
+        :param current_time: Time the token is being issued at
         :return: The generated access token
         """
 
-        return generate_jwt(
-            payload={"session_id": session_id, "exp": expiry_time}, key=settings.secret_key.get_secret_value()
+        payload = {
+            "type": "access",
+            "session_id": str(session_id),
+            "ver": version,
+            "exp": current_time + timedelta(seconds=settings.access_token_expiry_seconds),
+        }
+        if settings.stateless_access_tokens:
+            payload.update(
+                {
+                    "user_id": str(user.id),
+                    "username": user.username,
+                    "account_type": user.account_type,
+                    "enabled": user.enabled,
+                    # Fractional so that tokens issued just after a revocation are not mistaken for revoked ones
+                    "iat": current_time.timestamp(),
+                }
+            )
+        return generate_jwt(payload=payload, key=settings.secret_key.get_secret_value())
+
+    def _to_internal(self, user_session: UserSessionInDB, access_token: str, refresh_token: str) -> InternalUserSession:
+        """Returns an internal user session for a user session in the database
+
+        Only digests of the tokens are stored, so the tokens themselves must be given.
+
+        :param user_session: User session in the database
+        :param access_token: Current access token of the session
+        :param refresh_token: Current refresh token of the session
+        """
+
+        return InternalUserSession(
+            id=user_session.id,
+            user_id=user_session.user_id,
+            access_token=access_token,
+            refresh_token=refresh_token,
+            long_lived=user_session.long_lived,
+            expiry_time=user_session.expiry_time,
         )
 
     async def _create_internal(self, user: UserInDB, long_lived: bool) -> InternalUserSession:
@@ -42,53 +156,31 @@ class UserSessionsService:
 
         session_id = uuid4()
         current_time = datetime.now(timezone.utc)
-        expiry_time = current_time + timedelta(
-            seconds=(
-                settings.long_lived_refresh_token_expiry_seconds
-                if long_lived
-                else settings.refresh_token_expiry_seconds
-            )
-        )
+        expiry_time = self._get_expiry_time(long_lived, current_time)
+        access_token = self._generate_access_token(session_id, 1, user, current_time)
+        refresh_token = self._generate_refresh_token(session_id, user.id, long_lived, 1, expiry_time)
 
         user_session = UserSessionInDB(
             id=session_id,
             user_id=user.id,
-            access_token=self._generate_token(
-                str(session_id), current_time + timedelta(seconds=settings.access_token_expiry_seconds)
-            ),
-            refresh_token=self._generate_token(str(session_id), expiry_time),
+            access_token_digest=get_token_digest(access_token, settings.secret_key.get_secret_value()),
+            refresh_token_digest=get_token_digest(refresh_token, settings.secret_key.get_secret_value()),
             long_lived=long_lived,
             expiry_time=expiry_time,
+            version=1,
         )
 
-        user_session = await self._session.user_sessions.create(user_session)
-        return InternalUserSession.model_validate(user_session)
-
-    async def _refresh_internal(self, user_session: UserSessionInDB) -> InternalUserSession:
-        """Refreshes an internal user session
-
-        :param user: User to create the session for
-        :param long_lived: Whether the session should be long lived or not
-        :return: The created internal user session
-        """
-
-        current_time = datetime.now(timezone.utc)
-        expiry_time = current_time + timedelta(
-            seconds=(
-                settings.long_lived_refresh_token_expiry_seconds
-                if user_session.long_lived
-                else settings.refresh_token_expiry_seconds
+        if settings.max_sessions_per_user is None:
+            user_session = await self._session.user_sessions.create(user_session)
+        else:
+            user_session, evicted_ids = await self._session.user_sessions.create_and_evict_oldest(
+                user_session, settings.max_sessions_per_user
             )
-        )
+            for evicted_id in evicted_ids:
+                self._session_cache.invalidate_session(evicted_id)
+            await self._revocations.revoke_sessions(evicted_ids)
 
-        user_session.access_token = self._generate_token(
-            str(user_session.id), current_time + timedelta(seconds=settings.access_token_expiry_seconds)
-        )
-        user_session.refresh_token = self._generate_token(str(user_session.id), expiry_time)
-        user_session.expiry_time = expiry_time
-
-        user_session = await self._session.user_sessions.update(user_session)
-        return InternalUserSession.model_validate(user_session)
+        return self._to_internal(user_session, access_token, refresh_token)
 
     def _assign_session_tokens(self, internal_user_session: InternalUserSession, response: Response):
         """Assigns the tokens in an internal user session to the HTTP response as cookies
@@ -122,11 +214,12 @@ class UserSessionsService:
         response.delete_cookie(key="access_token")
         response.delete_cookie(key="refresh_token")
 
-    async def create(self, login: LoginPost, response: Response) -> UserSession:
+    async def create(self, login: LoginPost, response: Response, client_ip: Optional[str] = None) -> UserSession:
         """Creates a user session
 
         :param login: Login information
         :param response: FastAPI response object to set the cookies on
+        :param client_ip: IP address of the client logging in (if known)
         :return: Created user session
         :raises AuthenticationError: If a user with the given username is not found, the password is incorrect or if the user itself is disabled
         """
@@ -139,18 +232,43 @@ class UserSessionsService:
             pass
 
         # Verify the password
-        if user is None or not verify_password(login.password.get_secret_value(), user.hashed_password):
+        if user is None or not await verify_password_async(login.password.get_secret_value(), user.hashed_password):
+            self._audit_log.record(
+                AuditEventType.LOGIN_FAILED,
+                user_id=user.id if user is not None else None,
+                username=login.username,
+                client_ip=client_ip,
+            )
             raise AuthenticationError("Invalid username or password")
 
         # Verify the account is enabled
         if not user.enabled:
+            self._audit_log.record(
+                AuditEventType.LOGIN_FAILED, user_id=user.id, username=login.username, client_ip=client_ip
+            )
             raise AuthenticationError("Account is disabled. Please contact an admin.")
 
+        # Upgrade the stored hash now the password is known if it doesn't match the current hashing policy
+        if password_needs_rehash(user.hashed_password):
+            try:
+                user.hashed_password = await hash_password_async(login.password.get_secret_value())
+                user = await self._session.users.update(user)
+            except ServiceUnavailableError:
+                # Not worth failing the login over, it will be tried again next time
+                pass
+
         # Create the session
         internal_user_session = await self._create_internal(
             user, long_lived=login.long_lived if user.account_type == UserAccountType.DEFAULT else False
         )
 
+        self._audit_log.record(
+            AuditEventType.LOGIN,
+            user_id=internal_user_session.user_id,
+            session_id=internal_user_session.id,
+            client_ip=client_ip,
+        )
+
         # Assign the session tokens
         self._assign_session_tokens(internal_user_session, response)
 
@@ -168,19 +286,173 @@ class UserSessionsService:
         payload = verify_jwt(access_token, settings.secret_key.get_secret_value())
 
         # Obtain the session to which it belongs
-        user_session = await self._session.user_sessions.get(payload["session_id"])
+        try:
+            user_session = await self._session.user_sessions.get(payload["session_id"])
+        except RecordNotFoundError as exc:
+            # The session has been deleted e.g. by logging out or being revoked
+            raise AuthenticationError("Invalid token") from exc
+
+        self._verify_access_token_matches(access_token, payload, user_session)
+        return UserSession.model_validate(user_session)
+
+    async def verify_many(self, access_tokens: list[str]) -> list[Union[UserSession, AuthenticationError]]:
+        """Verify many user sessions given their access tokens, obtaining the sessions with a single query
+
+        :param access_tokens: Access tokens from the sessions to verify
+        :return: For each token in the same order, either its user session or the error raised verifying it
+        """
+
+        results: list[Optional[Union[UserSession, AuthenticationError]]] = [None] * len(access_tokens)
+        # Payloads of the tokens that are validly signed and unexpired, keyed by their index
+        payloads: dict[int, dict[str, Any]] = {}
+        for i, access_token in enumerate(access_tokens):
+            try:
+                payloads[i] = verify_jwt(access_token, settings.secret_key.get_secret_value())
+            except AuthenticationError as exc:
+                results[i] = exc
+
+        # Sessions with invalid IDs are skipped by get_many, so are treated as deleted below
+        user_sessions = {
+            str(user_session.id): user_session
+            for user_session in await self._session.user_sessions.get_many(
+                [str(payload.get("session_id")) for payload in payloads.values()]
+            )
+        }
+
+        for i, payload in payloads.items():
+            user_session = user_sessions.get(str(payload.get("session_id")))
+            try:
+                if user_session is None:
+                    # The session has been deleted e.g. by logging out or being revoked
+                    raise AuthenticationError("Invalid token")
+                self._verify_access_token_matches(access_tokens[i], payload, user_session)
+            except AuthenticationError as exc:
+                results[i] = exc
+                continue
+            results[i] = UserSession.model_validate(user_session)
+        return results
+
+    def _verify_access_token_matches(
+        self, access_token: str, payload: dict[str, Any], user_session: UserSessionInDB
+    ) -> None:
+        """Verifies an access token is the current one for the session it belongs to
+
+        :param access_token: Access token to verify
+        :param payload: Verified payload of the access token
+        :param user_session: Session the token belongs to
+        :raises AuthenticationError: If the token is not for the current version of the session
+        """
 
-        # Verify the token is the current one for the session
-        if user_session.access_token != access_token:
+        if "ver" in payload:
+            if payload.get("type") != "access" or payload["ver"] != user_session.version:
+                raise AuthenticationError("Invalid token")
+        # Issued before access tokens carried the version of their session
+        elif not verify_token_digest(
+            access_token, user_session.access_token_digest, settings.secret_key.get_secret_value()
+        ):
             raise AuthenticationError("Invalid token")
 
-        return UserSession.model_validate(user_session)
+    async def _rotate_tokens(
+        self, refresh_token: str, payload: dict[str, Any], current_time: datetime
+    ) -> InternalUserSession:
+        """Issues new access and refresh tokens for a user session, extending its expiry
+
+        :param refresh_token: Current refresh token of the session
+        :param payload: Verified payload of the refresh token
+        :param current_time: Time the tokens are being issued at
+        :return: The refreshed internal user session
+        :raises AuthenticationError: If the refresh token is no longer the current one for the session
+        """
+
+        try:
+            session_id, user_id = payload["session_id"], payload["user_id"]
+            long_lived, version = payload["long_lived"], payload["ver"]
+        except KeyError:
+            # Issued before refresh tokens carried the details of their session, so obtain them from the session
+            user_session = await self._session.user_sessions.get(payload["session_id"])
+            session_id, user_id = str(user_session.id), str(user_session.user_id)
+            long_lived, version = user_session.long_lived, user_session.version
+
+        expiry_time = self._get_expiry_time(long_lived, current_time)
+        user = await self._session.users.get(user_id) if settings.stateless_access_tokens else None
+
+        # Tokens carrying earlier versions of the session are no longer valid
+        version += 1
+        new_access_token = self._generate_access_token(session_id, version, user, current_time)
+        new_refresh_token = self._generate_refresh_token(session_id, user_id, long_lived, version, expiry_time)
+
+        # Only succeeds if the refresh token is still the current one for the session, so that it can only be used once
+        user_session = await self._session.user_sessions.update_if_refresh_token_matches(
+            session_id,
+            get_token_digest(refresh_token, settings.secret_key.get_secret_value()),
+            {
+                "access_token_digest": get_token_digest(new_access_token, settings.secret_key.get_secret_value()),
+                "refresh_token_digest": get_token_digest(new_refresh_token, settings.secret_key.get_secret_value()),
+                "expiry_time": expiry_time,
+                "version": version,
+            },
+        )
+        if user_session is None:
+            raise AuthenticationError("Invalid token")
+
+        await self._revocations.revoke_sessions([session_id], min_version=version)
+        self._session_cache.invalidate_session(session_id)
+        return self._to_internal(user_session, new_access_token, new_refresh_token)
+
+    async def _refresh_access_token(
+        self, refresh_token: str, payload: dict[str, Any], token_expiry_time: datetime, current_time: datetime
+    ) -> InternalUserSession:
+        """Issues a new access token for a user session without writing to the database, keeping its refresh token
+
+        :param refresh_token: Current refresh token of the session
+        :param payload: Verified payload of the refresh token
+        :param token_expiry_time: Time at which the refresh token expires
+        :param current_time: Time the access token is being issued at
+        :return: The internal user session with the new access token
+        :raises AuthenticationError: If the refresh token is no longer the current one for the session
+        """
+
+        refreshable_session = self._session_cache.get_refreshable(refresh_token)
+        if refreshable_session is None:
+            try:
+                user_session = await self._session.user_sessions.get(payload["session_id"])
+            except RecordNotFoundError as exc:
+                # The session has been deleted e.g. by logging out
+                raise AuthenticationError("Invalid token") from exc
+            if not verify_token_digest(
+                refresh_token, user_session.refresh_token_digest, settings.secret_key.get_secret_value()
+            ):
+                raise AuthenticationError("Invalid token")
+
+            refreshable_session = RefreshableSession(
+                session_id=str(user_session.id),
+                user_id=str(user_session.user_id),
+                version=user_session.version,
+                user=(
+                    User.model_validate(await self._session.users.get(user_session.user_id))
+                    if settings.stateless_access_tokens
+                    else None
+                ),
+            )
+            self._session_cache.add_refreshable(refresh_token, refreshable_session, token_expiry_time)
 
-    async def refresh(self, refresh_token: str, response: Response) -> UserSession:
+        return InternalUserSession(
+            id=refreshable_session.session_id,
+            user_id=refreshable_session.user_id,
+            access_token=self._generate_access_token(
+                refreshable_session.session_id, refreshable_session.version, refreshable_session.user, current_time
+            ),
+            refresh_token=refresh_token,
+            long_lived=payload["long_lived"],
+            expiry_time=token_expiry_time,
+        )
+
+    async def refresh(self, refresh_token: str, response: Response, client_ip: Optional[str] = None) -> UserSession:
         """Refresh a user session given its refresh token
 
         :param refresh_token: Refresh token from the session to refresh
         :param response: FastAPI response object to set the cookies on
+        :param client_ip: IP address of the client refreshing (if known)
         :return: The user session
         :raises AuthenticationError: If the refresh token has already been used to refresh the session before and is now invalid
         """
@@ -188,32 +460,98 @@ class UserSessionsService:
         # Verify the token
         payload = verify_jwt(refresh_token, settings.secret_key.get_secret_value())
 
-        # Obtain the user session to which it belongs
-        user_session = await self._session.user_sessions.get(payload["session_id"])
+        current_time = datetime.now(timezone.utc)
+        token_expiry_time = datetime.fromtimestamp(payload["exp"], timezone.utc)
 
-        # Verify the current refresh token is the current active one for the session
-        if user_session.refresh_token != refresh_token:
-            raise AuthenticationError("Invalid token")
+        try:
+            if payload.get("type", "refresh") != "refresh":
+                raise AuthenticationError("Invalid token")
+
+            # Only rotate the refresh token once it is close to expiring, until then only a new access token is needed
+            if (
+                "ver" in payload
+                and settings.refresh_token_rotation_window_seconds is not None
+                and (token_expiry_time - current_time).total_seconds() > settings.refresh_token_rotation_window_seconds
+            ):
+                internal_user_session = await self._refresh_access_token(
+                    refresh_token, payload, token_expiry_time, current_time
+                )
+            else:
+                internal_user_session = await self._rotate_tokens(refresh_token, payload, current_time)
+        except AuthenticationError:
+            # Most likely a refresh token being reused after it has been rotated or its session deleted
+            self._audit_log.record(
+                AuditEventType.REFRESH_FAILED, session_id=payload.get("session_id"), client_ip=client_ip
+            )
+            raise
 
-        # Refresh the session tokens
-        internal_user_session = await self._refresh_internal(user_session)
+        self._audit_log.record(
+            AuditEventType.REFRESH,
+            user_id=internal_user_session.user_id,
+            session_id=internal_user_session.id,
+            client_ip=client_ip,
+        )
 
         # Assign the session tokens
         self._assign_session_tokens(internal_user_session, response)
 
         return UserSession.model_validate(internal_user_session)
 
-    async def delete(self, session_id: str, response: Response) -> None:
-        """Delete a user session given its ID
+    async def delete(self, user_session: UserSession, response: Response, client_ip: Optional[str] = None) -> None:
+        """Delete a user session
 
-        :param session_id: ID of the session to delete
+        :param user_session: Session to delete
         :param response: FastAPI response object to remove the cookies from
+        :param client_ip: IP address of the client logging out (if known)
         """
 
-        await self._session.user_sessions.delete(session_id)
+        await self._session.user_sessions.delete(user_session.id)
+        self._session_cache.invalidate_session(user_session.id)
+        await self._revocations.revoke_sessions([user_session.id])
+        self._audit_log.record(
+            AuditEventType.LOGOUT, user_id=user_session.user_id, session_id=user_session.id, client_ip=client_ip
+        )
         self._remove_session_tokens(response)
 
-    async def delete_all_expired(self) -> None:
-        """Deletes all user sessions from the database that have expired before now"""
+    async def get_all_for_user(self, user_id: str) -> list[UserSession]:
+        """Returns all of the sessions of a user
+
+        :param user_id: ID of the user
+        :return: List of the user's sessions
+        :raises RecordNotFoundError: If the user is not found
+        """
+
+        # Ensures a missing user is reported as such rather than having no sessions
+        await self._session.users.get(user_id)
 
-        await self._session.user_sessions.delete_all_expired_before(datetime.now(timezone.utc))
+        return _user_sessions_adapter.validate_python(await self._session.user_sessions.get_all_for_user(user_id))
+
+    async def delete_all_for_user(self, user_id: str) -> None:
+        """Deletes all of the sessions of a user, revoking their tokens
+
+        :param user_id: ID of the user
+        :raises RecordNotFoundError: If the user is not found
+        """
+
+        await self._session.users.get(user_id)
+
+        await self._session.user_sessions.delete_all_for_user(user_id)
+        self._session_cache.invalidate_user(user_id)
+        await self._revocations.revoke_user(user_id)
+
+    async def delete_all_expired(self, batch_size: int) -> int:
+        """Deletes all user sessions from the database that have expired before now
+
+        Sessions are deleted in batches, each committed separately.
+
+        :param batch_size: Maximum number of sessions to delete in each batch
+        :return: Number of sessions deleted
+        """
+
+        current_time = datetime.now(timezone.utc)
+        total_deleted = 0
+        while True:
+            deleted = await self._session.user_sessions.delete_expired_before(current_time, batch_size)
+            total_deleted += deleted
+            if deleted < batch_size:
+                return total_deleted
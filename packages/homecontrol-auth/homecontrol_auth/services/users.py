@@ -1,18 +1,28 @@
+from typing import AsyncGenerator, Optional
+
 from pydantic import TypeAdapter
 
 from homecontrol_auth import security
 from homecontrol_auth.database.core import AuthDatabaseSession
 from homecontrol_auth.database.models import UserInDB
 from homecontrol_auth.schemas.users import User, UserAccountType, UserPatch, UserPost
+from homecontrol_auth.services.revocations import RevocationsService
+from homecontrol_auth.services.session_cache import VerifiedSessionCache
 
 
 class UsersService:
     """Service that handles users"""
 
     _session: AuthDatabaseSession
+    _session_cache: VerifiedSessionCache
+    _revocations: RevocationsService
 
-    def __init__(self, session: AuthDatabaseSession):
+    def __init__(
+        self, session: AuthDatabaseSession, session_cache: VerifiedSessionCache, revocations: RevocationsService
+    ):
         self._session = session
+        self._session_cache = session_cache
+        self._revocations = revocations
 
     async def create(self, user: UserPost) -> User:
         """Creates a user
@@ -28,7 +38,7 @@ class UsersService:
         user_out = await self._session.users.create(
             UserInDB(
                 username=user.username,
-                hashed_password=security.hash_password(user.password.get_secret_value()),
+                hashed_password=await security.hash_password_async(user.password.get_secret_value()),
                 account_type=UserAccountType.ADMIN if is_first_user else UserAccountType.DEFAULT,
                 enabled=is_first_user,
             )
@@ -53,6 +63,22 @@ class UsersService:
 
         return TypeAdapter(list[User]).validate_python(await self._session.users.get_all())
 
+    async def get_page(self, limit: int, after: Optional[str] = None) -> list[User]:
+        """Returns a page of users ordered by their IDs
+
+        :param limit: Maximum number of users to return
+        :param after: ID of the user after which the page should start (the last ID of the previous page)
+        :return: List of users
+        """
+
+        return TypeAdapter(list[User]).validate_python(await self._session.users.get_page(limit, after))
+
+    async def stream_all(self) -> AsyncGenerator[User, None]:
+        """Yields all users, loading them from the database in batches"""
+
+        async for user in self._session.users.stream_all():
+            yield User.model_validate(user)
+
     async def update(self, user_id: str, user_patch: UserPatch) -> User:
         """Updates a user
 
@@ -66,12 +92,23 @@ class UsersService:
         for key, value in update_data.items():
             setattr(user, key, value)
 
-        return User.model_validate(await self._session.users.update(user))
+        if update_data.get("enabled") is False:
+            # Disabled users may no longer use any of their sessions
+            await self._session.users.update_and_delete_sessions(user)
+            user_out = User.model_validate(user)
+        else:
+            user_out = User.model_validate(await self._session.users.update(user))
+        self._session_cache.invalidate_user(user_id)
+        # Tokens issued before now may carry the old account type or enabled state
+        await self._revocations.revoke_user(user_id)
+        return user_out
 
     async def delete(self, user_id: str) -> None:
-        """Delete a user given its ID
+        """Delete a user along with all of their sessions and API keys given its ID
 
         :param user_id: ID of the user to delete
         """
 
-        await self._session.users.delete(user_id)
+        await self._session.users.delete_with_credentials(user_id)
+        self._session_cache.invalidate_user(user_id)
+        await self._revocations.revoke_user(user_id)
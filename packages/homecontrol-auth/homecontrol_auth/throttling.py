@@ -0,0 +1,123 @@
+import math
+import time
+from typing import Optional
+
+from homecontrol_auth.exceptions import TooManyRequestsError
+
+
+class TokenBuckets:
+    """Token buckets that limit the rate of requests for each of a number of keys
+
+    Each key may make a burst of requests up to the capacity of its bucket, after which it is limited to the refill
+    rate. Buckets that have been idle for long enough to have refilled are evicted periodically, as they are no
+    different to a new bucket.
+    """
+
+    _capacity: float
+    _refill_per_second: float
+    # Time after which an idle bucket will have refilled
+    _idle_seconds: float
+    # Key -> tokens left in the bucket and the time they were last updated
+    _buckets: dict[str, tuple[float, float]]
+    _last_eviction: float
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        """Initialise
+
+        :param capacity: Maximum number of tokens in each bucket, i.e. the number of requests allowed in a burst
+        :param refill_per_second: Number of tokens added to each bucket per second
+        """
+
+        self._capacity = capacity
+        self._refill_per_second = refill_per_second
+        self._idle_seconds = capacity / refill_per_second
+        self._buckets = {}
+        self._last_eviction = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _tokens(self, key: str, now: float) -> float:
+        """Returns the number of tokens currently in the bucket of a key"""
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self._capacity
+        tokens, updated_at = bucket
+        return min(self._capacity, tokens + (now - updated_at) * self._refill_per_second)
+
+    def retry_after(self, key: str) -> float:
+        """Returns the number of seconds until the bucket of a key will have a token available (0 if it has one now)
+
+        :param key: Key of the bucket
+        """
+
+        tokens = self._tokens(key, time.monotonic())
+        return 0 if tokens >= 1 else (1 - tokens) / self._refill_per_second
+
+    def consume(self, key: str) -> None:
+        """Takes a token from the bucket of a key
+
+        :param key: Key of the bucket
+        """
+
+        now = time.monotonic()
+        self._buckets[key] = (self._tokens(key, now) - 1, now)
+        if now - self._last_eviction >= self._idle_seconds:
+            self._evict_idle(now)
+
+    def _evict_idle(self, now: float) -> None:
+        """Removes buckets that have refilled since they were last used"""
+
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if now - bucket[1] < self._idle_seconds}
+        self._last_eviction = now
+
+
+class LoginThrottle:
+    """Limits the rate of login attempts for each username and each client IP address
+
+    Checks are made entirely in memory, so rejected attempts are cheap.
+    """
+
+    _username_buckets: Optional[TokenBuckets]
+    _ip_buckets: Optional[TokenBuckets]
+
+    def __init__(
+        self,
+        username_burst: int,
+        username_per_second: float,
+        ip_burst: int,
+        ip_per_second: float,
+    ):
+        """Initialise
+
+        :param username_burst: Number of attempts allowed in a burst for each username (0 disables the limit)
+        :param username_per_second: Number of attempts allowed per second for each username after a burst
+        :param ip_burst: Number of attempts allowed in a burst for each client IP address (0 disables the limit)
+        :param ip_per_second: Number of attempts allowed per second for each client IP address after a burst
+        """
+
+        self._username_buckets = TokenBuckets(username_burst, username_per_second) if username_burst > 0 else None
+        self._ip_buckets = TokenBuckets(ip_burst, ip_per_second) if ip_burst > 0 else None
+
+    def check(self, username: str, client_ip: Optional[str]) -> None:
+        """Records a login attempt, rejecting it if either its username or client IP address has made too many
+
+        :param username: Username being logged in as
+        :param client_ip: IP address of the client (if known)
+        :raises TooManyRequestsError: If the attempt should be rejected
+        """
+
+        limits = []
+        if self._username_buckets is not None:
+            limits.append((self._username_buckets, username))
+        if self._ip_buckets is not None and client_ip is not None:
+            limits.append((self._ip_buckets, client_ip))
+
+        # Only consume from either bucket when both allow the attempt, so rejected attempts aren't counted
+        retry_after = max((buckets.retry_after(key) for buckets, key in limits), default=0)
+        if retry_after > 0:
+            raise TooManyRequestsError("Too many login attempts", math.ceil(retry_after))
+
+        for buckets, key in limits:
+            buckets.consume(key)
@@ -0,0 +1,67 @@
+"""
+Measures the cost of a primary key lookup when the statement is rebuilt on every call compared to reusing the cached
+statement of DatabaseRepository.get
+
+Run from the homecontrol-base-api directory with e.g.
+    uv run python -m benchmarks.cached_lookups --lookups 10000
+"""
+
+import asyncio
+import random
+import time
+from argparse import ArgumentParser
+from uuid import UUID
+
+from sqlalchemy import select
+
+from benchmarks.common import Base, BenchmarkDatabaseSession, ItemInDB, sqlite_settings
+from homecontrol_base_api.benchmarking import summarise, write_results
+from homecontrol_base_api.database.core import get_database
+
+
+async def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--lookups", type=int, default=5000, help="Number of lookups to time for each method")
+    parser.add_argument("--output", help="File to write the JSON results to (defaults to stdout)")
+    args = parser.parse_args()
+
+    async with get_database(BenchmarkDatabaseSession, sqlite_settings(":memory:")) as database:
+        async with database.connect() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        async with database.start_session() as session:
+            items = await session.items.create_many([ItemInDB(name="item", value=i) for i in range(1000)])
+            item_ids = [str(item.id) for item in items]
+
+        async with database.start_session(read_only=True) as session:
+            # The session's internal session is used to build the statement the way the repositories used to
+            orm_session = session._session
+
+            async def rebuilt(item_id: str):
+                return (await orm_session.execute(select(ItemInDB).where(ItemInDB.id == UUID(item_id)))).scalar_one()
+
+            async def cached(item_id: str):
+                return await session.items.get(item_id)
+
+            results = {"benchmark": "cached_lookups", "lookups": args.lookups, "methods": {}}
+            for name, lookup in (("rebuilt", rebuilt), ("cached", cached)):
+                # Warm up the compiled statement cache
+                for item_id in item_ids[:100]:
+                    await lookup(item_id)
+                # Avoid measuring the identity map rather than the lookup
+                orm_session.expunge_all()
+
+                durations = []
+                for _ in range(args.lookups):
+                    item_id = random.choice(item_ids)
+                    start = time.perf_counter()
+                    await lookup(item_id)
+                    durations.append(time.perf_counter() - start)
+                orm_session.expunge_all()
+                results["methods"][name] = summarise(durations)
+
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+"""
+Shared models and helpers for the database benchmarks
+"""
+
+from typing import Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from sqlalchemy.types import Integer, String, Uuid
+
+from homecontrol_base_api.config.core import DatabaseSettings
+from homecontrol_base_api.database.core import DatabaseSession
+from homecontrol_base_api.database.repository import DatabaseRepository
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class ItemInDB(Base):
+    """Item used for benchmarking"""
+
+    __tablename__ = "items"
+
+    id: Mapped[UUID] = mapped_column(Uuid, primary_key=True, default=uuid4)
+    name: Mapped[str] = mapped_column(String, index=True)
+    value: Mapped[int] = mapped_column(Integer)
+
+
+class ItemsSession(DatabaseRepository[ItemInDB]):
+    """Handles items in the database"""
+
+    _model = ItemInDB
+    _record_name = "item"
+
+
+class BenchmarkDatabaseSession(DatabaseSession):
+    """Handles a benchmark database session"""
+
+    _items: Optional[ItemsSession] = None
+
+    @property
+    def items(self) -> ItemsSession:
+        if not self._items:
+            self._items = ItemsSession(self._session)
+        return self._items
+
+
+def sqlite_settings(path: str, **kwargs) -> DatabaseSettings:
+    """Returns the settings for an SQLite database at the given path (or ':memory:')"""
+
+    return DatabaseSettings(driver="sqlite+aiosqlite", name=path, **kwargs)
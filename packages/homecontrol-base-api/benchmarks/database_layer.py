@@ -0,0 +1,156 @@
+"""
+Microbenchmarks of the database layer (Database, DatabaseSession and get_database) against in memory and on disk
+SQLite databases
+
+Each benchmark is timed per operation and summarised as JSON, so that results from before and after a change can be
+compared.
+
+Run from the homecontrol-base-api directory with e.g.
+    uv run python -m benchmarks.database_layer --iterations 2000 --output before.json
+"""
+
+import asyncio
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from typing import Awaitable, Callable
+
+import sqlalchemy
+
+from benchmarks.common import Base, BenchmarkDatabaseSession, ItemInDB, sqlite_settings
+from homecontrol_base_api.benchmarking import summarise, write_results
+from homecontrol_base_api.config.core import DatabaseSettings
+from homecontrol_base_api.database.core import Database, get_database
+
+
+async def time_operation(operation: Callable[[], Awaitable], iterations: int, warmup: int) -> dict[str, float]:
+    """Times an operation the given number of times after warming it up
+
+    :param operation: Operation to time
+    :param iterations: Number of times to time it
+    :param warmup: Number of times to run it before timing
+    :return: Summary of the durations
+    """
+
+    for _ in range(warmup):
+        await operation()
+
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await operation()
+        durations.append(time.perf_counter() - start)
+    return summarise(durations)
+
+
+async def benchmark_engine_creation(settings: DatabaseSettings, iterations: int) -> dict[str, float]:
+    """Times opening a database, making its first connection and closing it again"""
+
+    async def open_database():
+        async with get_database(BenchmarkDatabaseSession, settings) as database:
+            async with database.connect():
+                pass
+
+    return await time_operation(open_database, iterations, warmup=min(iterations, 10))
+
+
+async def benchmark_database(
+    database: Database[BenchmarkDatabaseSession], iterations: int, bulk_size: int, list_size: int
+) -> dict[str, dict[str, float]]:
+    """Runs the benchmarks that share a single open database"""
+
+    results = {}
+    warmup = min(iterations, 100)
+
+    async def start_session():
+        async with database.start_session():
+            pass
+
+    results["session_start"] = await time_operation(start_session, iterations, warmup)
+
+    async with database.start_session() as session:
+        items = await session.items.create_many([ItemInDB(name=f"item{i}", value=i) for i in range(list_size)])
+        item_ids = [str(item.id) for item in items]
+
+    async with database.start_session(read_only=True) as session:
+
+        async def get():
+            await session.items.get(random.choice(item_ids))
+            # Avoid measuring the identity map rather than the query
+            session._session.expunge_all()
+
+        results["get"] = await time_operation(get, iterations, warmup)
+
+        async def get_all():
+            await session.items.get_all()
+            session._session.expunge_all()
+
+        results["list"] = await time_operation(get_all, max(iterations // 100, 1), warmup=1)
+        results["list"]["rows"] = list_size
+
+    async with database.start_session() as session:
+
+        async def create():
+            await session.items.create(ItemInDB(name="created", value=0))
+            session._session.expunge_all()
+
+        results["insert_commit"] = await time_operation(create, iterations, warmup)
+
+        async def create_many():
+            await session.items.create_many([ItemInDB(name="bulk", value=i) for i in range(bulk_size)])
+            session._session.expunge_all()
+
+        results["bulk_insert"] = await time_operation(create_many, max(iterations // 100, 1), warmup=1)
+        results["bulk_insert"]["rows"] = bulk_size
+
+    return results
+
+
+async def run_backend(settings: DatabaseSettings, args) -> dict[str, dict[str, float]]:
+    """Runs all of the benchmarks against a database with the given settings"""
+
+    async with get_database(BenchmarkDatabaseSession, settings) as database:
+        async with database.connect() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        results = await benchmark_database(database, args.iterations, args.bulk_size, args.list_size)
+
+    results["engine_creation"] = await benchmark_engine_creation(settings, max(args.iterations // 10, 1))
+    return results
+
+
+async def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=1000, help="Number of times to time each operation")
+    parser.add_argument("--bulk-size", type=int, default=1000, help="Number of records in each bulk insert")
+    parser.add_argument("--list-size", type=int, default=1000, help="Number of records to list")
+    parser.add_argument(
+        "--backends", nargs="+", choices=["memory", "disk"], default=["memory", "disk"], help="Databases to run against"
+    )
+    parser.add_argument("--output", help="File to write the JSON results to (defaults to stdout)")
+    args = parser.parse_args()
+
+    results = {
+        "benchmark": "database_layer",
+        "environment": {
+            "python": sys.version.split()[0],
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+        },
+        "parameters": {"iterations": args.iterations, "bulk_size": args.bulk_size, "list_size": args.list_size},
+        "backends": {},
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        backends = {"memory": sqlite_settings(":memory:"), "disk": sqlite_settings(os.path.join(directory, "bench.db"))}
+        for name in args.backends:
+            results["backends"][name] = await run_backend(backends[name], args)
+
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
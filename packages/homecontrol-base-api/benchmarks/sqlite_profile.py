@@ -0,0 +1,101 @@
+"""
+Compares the throughput of an on disk SQLite database under concurrent reads and writes with and without the SQLite
+performance profile (see SQLiteSettings)
+
+Run from the homecontrol-base-api directory with e.g.
+    uv run python -m benchmarks.sqlite_profile --concurrency 16 --duration 10
+"""
+
+import asyncio
+import random
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+from sqlalchemy import exc as sqlalchemy_exc
+
+from benchmarks.common import Base, BenchmarkDatabaseSession, ItemInDB, sqlite_settings
+from homecontrol_base_api.benchmarking import summarise, write_results
+from homecontrol_base_api.config.core import SQLiteSettings
+from homecontrol_base_api.database.core import Database, get_database
+
+
+async def worker(
+    database: Database[BenchmarkDatabaseSession],
+    item_ids: list[str],
+    write_ratio: float,
+    end_time: float,
+    durations: dict[str, list[float]],
+    errors: list[str],
+):
+    """Repeatedly performs random reads and writes until the end time"""
+
+    while time.perf_counter() < end_time:
+        is_write = random.random() < write_ratio
+        start = time.perf_counter()
+        try:
+            async with database.start_session(read_only=not is_write) as session:
+                if is_write:
+                    await session.items.create(ItemInDB(name="item", value=random.randint(0, 1000)))
+                else:
+                    await session.items.get(random.choice(item_ids))
+        except sqlalchemy_exc.OperationalError as exc:
+            errors.append(str(exc.orig))
+            continue
+        durations["write" if is_write else "read"].append(time.perf_counter() - start)
+
+
+async def run(profile: bool, concurrency: int, duration: float, write_ratio: float, directory: str) -> dict:
+    """Runs the benchmark against a new database file"""
+
+    path = Path(directory) / f"{'profile' if profile else 'default'}.db"
+    settings = sqlite_settings(str(path), sqlite=SQLiteSettings() if profile else None)
+
+    async with get_database(BenchmarkDatabaseSession, settings) as database:
+        async with database.connect() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with database.start_session() as session:
+            items = await session.items.create_many([ItemInDB(name="item", value=i) for i in range(1000)])
+            item_ids = [str(item.id) for item in items]
+
+        durations = {"read": [], "write": []}
+        errors = []
+        start = time.perf_counter()
+        await asyncio.gather(
+            *[worker(database, item_ids, write_ratio, start + duration, durations, errors) for _ in range(concurrency)]
+        )
+        elapsed = time.perf_counter() - start
+
+    return {
+        "profile": profile,
+        "operations_per_second": (len(durations["read"]) + len(durations["write"])) / elapsed,
+        "errors": len(errors),
+        "read": summarise(durations["read"]) if durations["read"] else None,
+        "write": summarise(durations["write"]) if durations["write"] else None,
+    }
+
+
+async def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=16, help="Number of concurrent workers")
+    parser.add_argument("--duration", type=float, default=5, help="Duration of each run in seconds")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="Fraction of operations that are writes")
+    parser.add_argument("--output", help="File to write the JSON results to (defaults to stdout)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = {
+            "benchmark": "sqlite_profile",
+            "concurrency": args.concurrency,
+            "write_ratio": args.write_ratio,
+            "runs": [
+                await run(profile, args.concurrency, args.duration, args.write_ratio, directory)
+                for profile in (False, True)
+            ],
+        }
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,28 @@
+import json
+import statistics
+import sys
+from typing import Any, Optional
+
+
+def summarise(durations: list[float]) -> dict[str, float]:
+    """Summarises a list of durations (in seconds) in milliseconds"""
+
+    ordered = sorted(durations)
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": ordered[int(0.50 * (len(ordered) - 1))] * 1000,
+        "p95_ms": ordered[int(0.95 * (len(ordered) - 1))] * 1000,
+        "p99_ms": ordered[int(0.99 * (len(ordered) - 1))] * 1000,
+    }
+
+
+def write_results(results: Any, output: Optional[str]):
+    """Writes results as JSON to the given file, or stdout when None"""
+
+    if output is None:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
@@ -1,9 +1,25 @@
-from typing import Optional
+from typing import Any, Literal, Optional
 
 from pydantic import BaseModel, SecretStr
 from sqlalchemy import URL
 
 
+class SQLiteSettings(BaseModel):
+    """Pragmas applied to each new SQLite connection to tune its performance"""
+
+    # WAL allows readers to continue while a write is in progress
+    journal_mode: Literal["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"] = "WAL"
+    # NORMAL is safe from corruption when using WAL, only the most recent commits may be lost on power loss
+    synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    # Maximum number of bytes of the database file to memory map
+    mmap_size: int = 268435456
+    # Page cache size, negative values are in KiB rather than pages
+    cache_size: int = -65536
+    # Milliseconds to wait for a lock before raising 'database is locked'
+    busy_timeout: int = 5000
+    temp_store: Literal["DEFAULT", "FILE", "MEMORY"] = "MEMORY"
+
+
 class DatabaseSettings(BaseModel):
     """Setting required for connecting to a database"""
 
@@ -14,6 +30,32 @@ class DatabaseSettings(BaseModel):
     port: Optional[int] = None
     name: Optional[str] = None
 
+    # Connection pool (when left as None the defaults of the dialect's pool are used)
+    pool_size: Optional[int] = None
+    max_overflow: Optional[int] = None
+    pool_pre_ping: bool = False
+    pool_recycle: int = -1
+
+    # URLs of read replicas that read only sessions are spread across (the primary is used when there are none)
+    read_replicas: list[SecretStr] = []
+
+    # Statements taking longer than this many milliseconds are logged (when None no statements are logged)
+    slow_query_threshold_ms: Optional[float] = None
+
+    # Performance profile to apply when using SQLite (when None SQLite's defaults are used)
+    sqlite: Optional[SQLiteSettings] = None
+
+    # Whether to perform writes through a single writer that commits them in groups (recommended for SQLite when there
+    # are many concurrent writes) and the maximum number of writes to commit together. The writer uses a connection of
+    # its own in addition to those of the pool.
+    serialise_writes: bool = False
+    write_batch_size: int = 64
+
+    # Number of compiled statements SQLAlchemy caches per engine (when None SQLAlchemy's default is used)
+    query_cache_size: Optional[int] = None
+    # Number of prepared statements the driver caches per connection (only supported by asyncpg)
+    prepared_statement_cache_size: Optional[int] = None
+
 
 def get_database_url(database_settings: DatabaseSettings) -> URL:
     return URL.create(
@@ -24,3 +66,28 @@ def get_database_url(database_settings: DatabaseSettings) -> URL:
         port=database_settings.port,
         database=database_settings.name,
     )
+
+
+def get_engine_options(database_settings: DatabaseSettings) -> dict[str, Any]:
+    """Returns the keyword arguments to pass to create_async_engine for the given settings
+
+    Only options that have been set are returned, as some pools (e.g. the StaticPool used for in memory SQLite
+    databases) reject sizing arguments
+    """
+
+    options: dict[str, Any] = {"pool_pre_ping": database_settings.pool_pre_ping}
+    if database_settings.pool_size is not None:
+        options["pool_size"] = database_settings.pool_size
+    if database_settings.max_overflow is not None:
+        options["max_overflow"] = database_settings.max_overflow
+    if database_settings.pool_recycle >= 0:
+        options["pool_recycle"] = database_settings.pool_recycle
+    if database_settings.query_cache_size is not None:
+        options["query_cache_size"] = database_settings.query_cache_size
+    if (
+        database_settings.prepared_statement_cache_size is not None
+        and database_settings.driver is not None
+        and get_database_url(database_settings).get_driver_name() == "asyncpg"
+    ):
+        options["connect_args"] = {"prepared_statement_cache_size": database_settings.prepared_statement_cache_size}
+    return options
@@ -1,5 +1,6 @@
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator, Generic, Type, TypeVar
+from itertools import cycle
+from typing import Any, AsyncGenerator, Generic, Iterator, Optional, Type, TypeVar
 
 from sqlalchemy.ext.asyncio import (
     AsyncConnection,
@@ -8,8 +9,14 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
 )
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
-from homecontrol_base_api.config.core import DatabaseSettings, get_database_url
+from homecontrol_base_api.config.core import DatabaseSettings, get_database_url, get_engine_options
+from homecontrol_base_api.database.instrumentation import instrument_engine
+from homecontrol_base_api.database.sqlite import apply_sqlite_settings
+from homecontrol_base_api.database.writer import WriteOperation, WriteQueue
+
+T = TypeVar("T")
 
 
 class DatabaseSession:
@@ -24,30 +31,121 @@ class DatabaseSession:
         """
         self._session = session
 
+    async def _write(self, operation: WriteOperation[T]) -> T:
+        """Performs a write operation and commits it
+
+        When the database serialises writes, the operation is performed by its writer in a separate session and
+        committed along with any others that are queued at the same time. Otherwise it is performed and committed
+        using this session, which is rolled back if it fails.
+
+        :param operation: Operation to perform. It should not commit itself.
+        :return: The value returned by the operation
+        """
+
+        write_queue: Optional[WriteQueue] = self._session.info.get("write_queue")
+        if write_queue is not None:
+            return await write_queue.submit(operation)
+
+        try:
+            result = await operation(self._session)
+        except Exception:
+            await self._session.rollback()
+            raise
+        await self._session.commit()
+        return result
+
 
 TDatabaseSession = TypeVar("TDatabaseConnection", bound=DatabaseSession)
 
 
+def _read_only_engine(engine: AsyncEngine) -> AsyncEngine:
+    """Returns a version of an engine whose connections are marked as read only where the dialect supports it"""
+
+    if engine.dialect.name == "postgresql":
+        return engine.execution_options(postgresql_readonly=True)
+    return engine
+
+
+def _create_write_engine(engine: AsyncEngine, engine_options: dict[str, Any]) -> Optional[AsyncEngine]:
+    """Returns a separate engine for the writer of serialised writes when it can't share the pool of an engine
+
+    Sessions hold their connections while waiting for the writer, so when the pool of an engine has a limit the writer
+    is given a connection of its own. Otherwise the writer could be left waiting for one of their connections forever.
+
+    :return: The engine, or None when the writer can use the given engine
+    """
+
+    if not isinstance(engine.pool, QueuePool):
+        # Other pools (e.g. the NullPool or the StaticPool of an in memory SQLite database) can't run out of connections
+        return None
+    return create_async_engine(engine.url, **{**engine_options, "pool_size": 1, "max_overflow": 0})
+
+
 class Database(Generic[TDatabaseSession]):
     """Base class for handling connections to a database"""
 
     _engine: AsyncEngine
+    _read_engines: list[AsyncEngine]
+    _write_engine: Optional[AsyncEngine]
     _session_maker: sessionmaker
+    _read_only_session_makers: Iterator[sessionmaker]
+    _write_queue: Optional[WriteQueue]
     _session_type = Type[TDatabaseSession]
 
     def __init__(self, session_type: Type[TDatabaseSession], database_settings: DatabaseSettings):
-        """Initialise the database engine"""
+        """Initialise the database engine and its connection pool"""
+
+        engine_options = get_engine_options(database_settings)
+
+        self._engine = create_async_engine(get_database_url(database_settings), **engine_options)
+        self._read_engines = [
+            create_async_engine(url.get_secret_value(), **engine_options) for url in database_settings.read_replicas
+        ]
+        self._write_engine = (
+            _create_write_engine(self._engine, engine_options) if database_settings.serialise_writes else None
+        )
+        engines = [self._engine, *self._read_engines]
+        if self._write_engine is not None:
+            engines.append(self._write_engine)
+        for engine in engines:
+            instrument_engine(engine, database_settings.slow_query_threshold_ms)
+            if database_settings.sqlite is not None:
+                apply_sqlite_settings(engine, database_settings.sqlite)
 
-        self._engine = create_async_engine(get_database_url(database_settings))
         self._session_maker = sessionmaker(self._engine, expire_on_commit=False, class_=AsyncSession)
+        # Read only sessions are assigned to the replicas in turn, falling back to the primary when there are none
+        self._read_only_session_makers = cycle(
+            [
+                sessionmaker(_read_only_engine(engine), expire_on_commit=False, autoflush=False, class_=AsyncSession)
+                for engine in (self._read_engines or [self._engine])
+            ]
+        )
+        self._write_queue = (
+            WriteQueue(
+                sessionmaker(self._write_engine or self._engine, expire_on_commit=False, class_=AsyncSession),
+                database_settings.write_batch_size,
+            )
+            if database_settings.serialise_writes
+            else None
+        )
         self._session_type = session_type
 
     async def close(self):
         """This should be called to close any connections to this database"""
 
+        if self._write_queue is not None:
+            await self._write_queue.close()
+            self._write_queue = None
+        if self._write_engine is not None:
+            await self._write_engine.dispose()
         await self._engine.dispose()
+        for engine in self._read_engines:
+            await engine.dispose()
         self._engine = None
+        self._read_engines = []
+        self._write_engine = None
         self._session_maker = None
+        self._read_only_session_makers = None
 
     @asynccontextmanager
     async def connect(self) -> AsyncGenerator[AsyncConnection, None]:
@@ -57,10 +155,17 @@ class Database(Generic[TDatabaseSession]):
             yield conn
 
     @asynccontextmanager
-    async def start_session(self) -> AsyncGenerator[TDatabaseSession, None]:
-        """Starts a new connection with the database"""
+    async def start_session(self, read_only: bool = False) -> AsyncGenerator[TDatabaseSession, None]:
+        """Starts a new connection with the database
 
-        async with self._session_maker() as session:
+        :param read_only: Whether the session will only be used for reading. Read only sessions are never committed
+                          and may be served by a read replica, so they may not observe the latest writes.
+        """
+
+        session_maker = next(self._read_only_session_makers) if read_only else self._session_maker
+        async with session_maker() as session:
+            if not read_only:
+                session.info["write_queue"] = self._write_queue
             try:
                 await session.begin()
                 yield self._session_type(session)
@@ -72,7 +177,10 @@ class Database(Generic[TDatabaseSession]):
 async def get_database(
     session_type: Type[TDatabaseSession], settings: DatabaseSettings
 ) -> AsyncGenerator[Database[TDatabaseSession], None]:
-    """Obtains a database session.
+    """Opens a database, disposing of its connection pool on exit.
+
+    This is intended to be entered once for the lifetime of an application (e.g. in a FastAPI lifespan) with the
+    resulting database shared between requests, so that sessions borrow connections from the same pool.
 
     :param session_type: Type of database session to initialise.
     :param settings: Database settings.
@@ -87,14 +195,3 @@ async def get_database(
 
 # See https://medium.com/@tclaitken/setting-up-a-fastapi-app-with-async-sqlalchemy-2-0-pydantic-v2-e6c540be4308 on how to use for FastAPI
 # and https://praciano.com.br/fastapi-and-async-sqlalchemy-20-with-pytest-done-right.html
-
-
-# # Effectively would need the following for a service
-# database: Database = Database()
-
-# @asynccontextmanager
-# async def lifespan(app: FastAPI):
-#     yield
-#     if database._engine is not None:
-#         # Close the DB connection
-#         await database.close()
@@ -0,0 +1,83 @@
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger()
+
+
+@dataclass
+class QueryStats:
+    """Statistics on the queries executed within a context (e.g. while handling a request)"""
+
+    count: int = 0
+    # Times are in seconds
+    total_time: float = 0.0
+    slowest_time: float = 0.0
+    slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, duration: float):
+        """Records the execution of a statement
+
+        :param statement: Statement that was executed
+        :param duration: Time taken to execute it in seconds
+        """
+
+        self.count += 1
+        self.total_time += duration
+        if duration >= self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = statement
+
+
+# Statistics for the current context, statements executed while this is None are not recorded
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _redact_parameters(parameters: Any) -> Any:
+    """Replaces the values of statement parameters so that they can be logged safely"""
+
+    if isinstance(parameters, dict):
+        return {key: "<redacted>" for key in parameters}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # Parameters of an executemany
+            return [_redact_parameters(parameter_set) for parameter_set in parameters]
+        return ["<redacted>"] * len(parameters)
+    return "<redacted>"
+
+
+def instrument_engine(engine: AsyncEngine, slow_query_threshold_ms: Optional[float] = None):
+    """Adds event hooks to an engine that time each statement it executes
+
+    Timings are recorded in the QueryStats of the current context (if any) and statements that take longer than the
+    given threshold are logged with their parameters redacted.
+
+    :param engine: Engine to instrument
+    :param slow_query_threshold_ms: Duration in milliseconds above which statements should be logged. When None no
+                                    statements are logged.
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, _cursor, _statement, _parameters, _context, _executemany):
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, _cursor, statement, parameters, _context, _executemany):
+        duration = time.perf_counter() - conn.info["query_start_times"].pop()
+
+        stats = query_stats.get()
+        if stats is not None:
+            stats.record(statement, duration)
+
+        if slow_query_threshold_ms is not None and duration * 1000 >= slow_query_threshold_ms:
+            logger.warning(
+                "Slow query took %.1f ms: %s [parameters: %s]",
+                duration * 1000,
+                statement,
+                _redact_parameters(parameters),
+            )
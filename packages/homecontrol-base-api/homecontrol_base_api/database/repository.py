@@ -0,0 +1,309 @@
+from typing import Any, AsyncGenerator, Callable, Generic, Iterable, Optional, Type, TypeVar, Union
+from uuid import UUID
+
+from sqlalchemy import RowMapping, bindparam, delete, insert, inspect, select, update
+from sqlalchemy import exc as sqlalchemy_exc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import exc as orm_exc
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql.expression import Executable
+
+from homecontrol_base_api.database.core import DatabaseSession
+from homecontrol_base_api.database.writer import WriteOperation
+from homecontrol_base_api.exceptions import RecordNotFoundError
+from homecontrol_base_api.types import convert_string_to_uuid
+
+TRecord = TypeVar("TRecord")
+
+# Statements that have been built by repositories, keyed by the repository class and the name of the statement
+_statement_cache: dict[tuple[type, str], Executable] = {}
+
+
+class DatabaseRepository(DatabaseSession, Generic[TRecord]):
+    """Base class for handling a single type of record in the database
+
+    Records are expected to have a UUID primary key named 'id'. Subclasses should assign the model of the record and a
+    name to use for it in error messages.
+    """
+
+    _model: Type[TRecord]
+    _record_name: str
+
+    @classmethod
+    def _cached_statement(cls, name: str, build: Callable[[], Executable]) -> Executable:
+        """Returns a statement that is built once per repository class and then reused
+
+        Reusing the same statement object avoids rebuilding it on every call and allows SQLAlchemy to reuse its
+        memoized cache key to look up the compiled form. Values should be supplied using bindparam's.
+
+        :param name: Name of the statement, unique within the repository class
+        :param build: Function that builds the statement
+        :return: The statement
+        """
+
+        key = (cls, name)
+        statement = _statement_cache.get(key)
+        if statement is None:
+            statement = _statement_cache[key] = build()
+        return statement
+
+    def _not_found_error(self, record_id: Any) -> RecordNotFoundError:
+        """Returns the error to raise when a record with the given ID is not found"""
+
+        return RecordNotFoundError(f"No {self._record_name} found with the ID '{record_id}'")
+
+    def _to_uuid(self, record_id: Union[str, UUID]) -> UUID:
+        """Converts a record ID to a UUID
+
+        :param record_id: ID of the record
+        :return: The ID as a UUID
+        :raises RecordNotFoundError: If the ID is not a valid UUID, as no record could have it
+        """
+
+        if isinstance(record_id, UUID):
+            return record_id
+        try:
+            return UUID(record_id)
+        except ValueError as exc:
+            raise self._not_found_error(record_id) from exc
+
+    def _to_uuids(self, record_ids: Iterable[Union[str, UUID]]) -> list[UUID]:
+        """Converts record IDs to UUIDs, skipping any that are invalid as they cannot match a record"""
+
+        uuids = []
+        for record_id in record_ids:
+            try:
+                uuids.append(self._to_uuid(record_id))
+            except RecordNotFoundError:
+                pass
+        return uuids
+
+    def _assigned_values(self, record: TRecord) -> dict[str, Any]:
+        """Returns the column values that have been assigned to a record"""
+
+        state = inspect(record)
+        return {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
+
+    def _changed_values(self, record: TRecord) -> dict[str, Any]:
+        """Returns the column values of a record that have been changed since it was loaded"""
+
+        state = inspect(record)
+        return {
+            attr.key: state.dict[attr.key]
+            for attr in state.mapper.column_attrs
+            if state.attrs[attr.key].history.has_changes()
+        }
+
+    def _insert_operation(self, record: TRecord) -> WriteOperation[TRecord]:
+        """Returns a write operation that inserts a record, so that it may be combined with others in one transaction
+
+        Where the dialect supports it this uses INSERT ... RETURNING so the created record is loaded from the same
+        statement, otherwise it is refreshed after being flushed.
+
+        :param record: Record to insert
+        :return: The operation, which returns the created record
+        """
+
+        values = self._assigned_values(record)
+
+        async def insert_record(session: AsyncSession) -> TRecord:
+            if session.bind.dialect.insert_returning:
+                return (await session.execute(insert(self._model).values(**values).returning(self._model))).scalar_one()
+
+            session.add(record)
+            await session.flush()
+            await session.refresh(record)
+            return record
+
+        return insert_record
+
+    async def create(self, record: TRecord) -> TRecord:
+        """Creates a record in the database
+
+        :param record: Record to create
+        :return: Created record
+        """
+
+        return await self._write(self._insert_operation(record))
+
+    async def create_many(self, records: list[TRecord]) -> list[TRecord]:
+        """Creates several records in the database, inserting them with a single statement
+
+        :param records: Records to create
+        :return: Created records
+        """
+
+        async def insert_records(session: AsyncSession) -> list[TRecord]:
+            session.add_all(records)
+            await session.flush()
+            return records
+
+        return await self._write(insert_records)
+
+    async def get(self, record_id: str) -> TRecord:
+        """Returns a record from the database given its ID
+
+        :param record_id: ID of the record to get
+        :return: The record
+        :raises RecordNotFoundError: If the record with the given ID is not found in the database
+        """
+
+        statement = self._cached_statement(
+            "get", lambda: select(self._model).where(self._model.id == bindparam("record_id"))
+        )
+        try:
+            return (await self._session.execute(statement, {"record_id": self._to_uuid(record_id)})).scalar_one()
+        except sqlalchemy_exc.NoResultFound as exc:
+            raise self._not_found_error(record_id) from exc
+
+    async def get_many(self, record_ids: Iterable[str]) -> list[TRecord]:
+        """Returns the records from the database with any of the given IDs using a single query
+
+        :param record_ids: IDs of the records to get
+        :return: List of the records that were found (in no particular order)
+        """
+
+        uuids = self._to_uuids(record_ids)
+        if not uuids:
+            return []
+
+        statement = self._cached_statement(
+            "get_many", lambda: select(self._model).where(self._model.id.in_(bindparam("record_ids", expanding=True)))
+        )
+        return (await self._session.execute(statement, {"record_ids": uuids})).scalars().all()
+
+    async def get_all(self) -> list[TRecord]:
+        """Returns a list of all records in the database
+
+        :return: List of records
+        """
+
+        return (await self._session.execute(select(self._model))).scalars().all()
+
+    async def get_page(self, limit: int, after: Optional[Union[str, UUID]] = None) -> list[TRecord]:
+        """Returns a page of records ordered by their IDs using keyset pagination
+
+        :param limit: Maximum number of records to return
+        :param after: ID of the record after which the page should start (usually the last ID of the previous page).
+                      When None the first page is returned.
+        :return: List of records
+        :raises InvalidUUIDError: If after is not a valid UUID
+        """
+
+        statement = select(self._model).order_by(self._model.id).limit(limit)
+        if after is not None:
+            statement = statement.where(self._model.id > convert_string_to_uuid(after))
+        return (await self._session.execute(statement)).scalars().all()
+
+    async def stream_all(self, batch_size: int = 100) -> AsyncGenerator[TRecord, None]:
+        """Yields all records in the database, loading them a batch at a time
+
+        Each batch is removed from the session once it has been yielded, so that memory use is bounded by the batch
+        size rather than the number of records.
+
+        :param batch_size: Number of records to load at a time
+        """
+
+        after = None
+        while True:
+            page = await self.get_page(batch_size, after)
+            for record in page:
+                yield record
+            if len(page) < batch_size:
+                return
+
+            after = page[-1].id
+            for record in page:
+                self._session.expunge(record)
+
+    async def update(self, record: TRecord) -> TRecord:
+        """Updates a record by commiting any changes to the database
+
+        Where the dialect supports it this uses UPDATE ... RETURNING, otherwise the updated row is selected after the
+        update. Either way the row is loaded into the record once the update has been committed.
+
+        :param record: Record to update
+        :return: The record
+        """
+
+        changed_values = self._changed_values(record)
+        if not changed_values:
+            return record
+
+        table = self._model.__table__
+        record_id = record.id
+        statement = update(table).where(table.c.id == record_id).values(changed_values)
+
+        async def update_record(session: AsyncSession) -> RowMapping:
+            if session.bind.dialect.update_returning:
+                return (await session.execute(statement.returning(*table.c))).one()._mapping
+
+            await session.execute(statement)
+            return (await session.execute(select(*table.c).where(table.c.id == record_id))).one()._mapping
+
+        # The statement writes the changes, so mark them as committed so that the session doesn't also flush them
+        for key, value in changed_values.items():
+            set_committed_value(record, key, value)
+
+        # Only the row is returned by the operation, as it may be performed using the session of a writer that doesn't
+        # own the record
+        row = await self._write(update_record)
+        for attr in inspect(record).mapper.column_attrs:
+            set_committed_value(record, attr.key, row[attr.columns[0]])
+        return record
+
+    async def update_many(self, values: list[dict[str, Any]]) -> None:
+        """Updates several records given their IDs and new values, using a single statement
+
+        Records that have already been loaded in this session are not refreshed with the new values.
+
+        :param values: List of dictionaries containing the 'id' of each record to update along with the values to
+                       assign to it
+        :raises RecordNotFoundError: If any of the records are not found in the database
+        """
+
+        if not values:
+            return
+
+        values = [{**record_values, "id": self._to_uuid(record_values["id"])} for record_values in values]
+
+        async def update_records(session: AsyncSession) -> None:
+            await session.execute(update(self._model), values)
+
+        try:
+            await self._write(update_records)
+        except orm_exc.StaleDataError as exc:
+            raise RecordNotFoundError(f"Not all of the {self._record_name} records to update were found") from exc
+
+    async def delete(self, record_id: str) -> None:
+        """Deletes a record from the database given its ID
+
+        :param record_id: ID of the record to delete
+        :raises RecordNotFoundError: If the record with the given ID is not found in the database
+        """
+
+        statement = delete(self._model).where(self._model.id == self._to_uuid(record_id))
+
+        async def delete_record(session: AsyncSession) -> int:
+            return (await session.execute(statement)).rowcount
+
+        if await self._write(delete_record) == 0:
+            raise self._not_found_error(record_id)
+
+    async def delete_many(self, record_ids: Iterable[str]) -> int:
+        """Deletes the records from the database with any of the given IDs using a single statement
+
+        :param record_ids: IDs of the records to delete
+        :return: Number of records deleted
+        """
+
+        uuids = self._to_uuids(record_ids)
+        if not uuids:
+            return 0
+
+        statement = delete(self._model).where(self._model.id.in_(uuids))
+
+        async def delete_records(session: AsyncSession) -> int:
+            return (await session.execute(statement)).rowcount
+
+        return await self._write(delete_records)
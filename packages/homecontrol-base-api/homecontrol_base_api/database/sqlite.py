@@ -0,0 +1,24 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from homecontrol_base_api.config.core import SQLiteSettings
+
+
+def apply_sqlite_settings(engine: AsyncEngine, sqlite_settings: SQLiteSettings):
+    """Adds a hook to an engine that applies the given pragmas to each new SQLite connection
+
+    :param engine: Engine to apply the settings to (engines using a dialect other than SQLite are ignored)
+    :param sqlite_settings: Settings to apply
+    """
+
+    if engine.dialect.name != "sqlite":
+        return
+
+    pragmas = sqlite_settings.model_dump()
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
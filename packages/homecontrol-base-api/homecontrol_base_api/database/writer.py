@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+logger = logging.getLogger()
+
+T = TypeVar("T")
+
+# A write to perform using a session, the writer commits it afterwards
+WriteOperation = Callable[[AsyncSession], Awaitable[T]]
+
+
+class WriteQueue:
+    """Serialises writes to a database through a single writer task that commits them in groups
+
+    This avoids writers contending for the single write lock of an SQLite database. Operations queued while a group is
+    being committed are run together in the next transaction, so that they share a single commit. If any operation in
+    a group fails, the group is rolled back and its operations retried one at a time so only the failing one raises.
+    """
+
+    _session_maker: sessionmaker
+    _max_batch_size: int
+    _queue: asyncio.Queue
+    _task: Optional[asyncio.Task] = None
+    _closed: bool = False
+
+    def __init__(self, session_maker: sessionmaker, max_batch_size: int):
+        """Initialise
+
+        :param session_maker: Session maker to create the sessions of the writer with
+        :param max_batch_size: Maximum number of operations to commit in a single transaction
+        """
+
+        self._session_maker = session_maker
+        self._max_batch_size = max_batch_size
+        self._queue = asyncio.Queue()
+
+    async def submit(self, operation: WriteOperation[T]) -> T:
+        """Queues a write operation and waits for it to be committed
+
+        :param operation: Operation to perform. It should not commit and may be called more than once if it has to be
+                          retried.
+        :return: The value returned by the operation
+        :raises RuntimeError: If the writer has been closed
+        """
+
+        if self._closed:
+            raise RuntimeError("Cannot submit a write operation after the writer has been closed")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, future))
+        return await future
+
+    async def close(self):
+        """Waits for any queued operations to be committed and stops the writer"""
+
+        self._closed = True
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+
+    async def _run(self):
+        """Commits groups of queued operations until stopped"""
+
+        stopping = False
+        while not stopping:
+            batch = [await self._queue.get()]
+            while len(batch) < self._max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            if None in batch:
+                stopping = True
+                batch.remove(None)
+
+            batch = [(operation, future) for operation, future in batch if not future.cancelled()]
+            if batch:
+                await self._commit_batch(batch)
+
+    async def _commit_batch(self, batch: list[tuple[WriteOperation, asyncio.Future]]):
+        """Runs a group of operations in a single transaction"""
+
+        try:
+            async with self._session_maker() as session:
+                results = [await operation(session) for operation, _ in batch]
+                await session.commit()
+        # Operations may raise any error, which must be passed on to their callers rather than stopping the writer
+        except Exception as exc:  # noqa: BLE001
+            if len(batch) == 1:
+                logger.exception("Write failed")
+                _, future = batch[0]
+                if not future.cancelled():
+                    future.set_exception(exc)
+                return
+
+            logger.exception("Group commit of %d writes failed, retrying them individually", len(batch))
+            for operation, future in batch:
+                await self._commit_single(operation, future)
+            return
+
+        for (_, future), result in zip(batch, results, strict=True):
+            if not future.cancelled():
+                future.set_result(result)
+
+    async def _commit_single(self, operation: WriteOperation, future: asyncio.Future):
+        """Runs a single operation in its own transaction, passing any error on to its caller"""
+
+        result: Any = None
+        try:
+            async with self._session_maker() as session:
+                result = await operation(session)
+                await session.commit()
+        # As above, the writer must survive any error an operation raises
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Write failed")
+            if not future.cancelled():
+                future.set_exception(exc)
+            return
+
+        if not future.cancelled():
+            future.set_result(result)
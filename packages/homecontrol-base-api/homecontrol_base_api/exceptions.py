@@ -1,4 +1,5 @@
 import logging
+from typing import Optional
 
 from fastapi import Request, status
 from fastapi.encoders import jsonable_encoder
@@ -11,6 +12,8 @@ class BaseAPIError(Exception):
     """Base class for an API error"""
 
     status_code: int
+    # Additional headers to include in the response
+    headers: Optional[dict[str, str]] = None
 
 
 class DatabaseError(BaseAPIError):
@@ -40,4 +43,5 @@ async def handle_base_api_error(_: Request, exc: BaseAPIError) -> JSONResponse:
     return JSONResponse(
         status_code=exc.status_code,
         content=jsonable_encoder({"detail": str(exc)}),
+        headers=exc.headers,
     )
@@ -0,0 +1,34 @@
+import logging
+from typing import Awaitable, Callable
+
+from fastapi import Request, Response
+
+from homecontrol_base_api.database.instrumentation import QueryStats, query_stats
+
+logger = logging.getLogger()
+
+
+async def record_query_stats(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+    """HTTP middleware that records statistics on the database queries executed while handling each request
+
+    The totals are reported in a Server-Timing header and logged at debug level.
+    """
+
+    stats = QueryStats()
+    token = query_stats.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        query_stats.reset(token)
+
+    response.headers["Server-Timing"] = f'db;dur={stats.total_time * 1000:.2f};desc="{stats.count} queries"'
+    logger.debug(
+        "%s %s executed %d queries in %.1f ms (slowest %.1f ms: %s)",
+        request.method,
+        request.url.path,
+        stats.count,
+        stats.total_time * 1000,
+        stats.slowest_time * 1000,
+        stats.slowest_statement,
+    )
+    return response
@@ -0,0 +1,25 @@
+from typing import AsyncIterable, AsyncIterator
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+
+async def _encode_ndjson(models: AsyncIterable[BaseModel]) -> AsyncIterator[str]:
+    """Encodes each model as a line of JSON"""
+
+    async for model in models:
+        yield model.model_dump_json() + "\n"
+
+
+class NDJSONResponse(StreamingResponse):
+    """Response that streams models as newline delimited JSON as they are produced"""
+
+    media_type = "application/x-ndjson"
+
+    def __init__(self, models: AsyncIterable[BaseModel], **kwargs):
+        """Initialise
+
+        :param models: Models to stream
+        """
+
+        super().__init__(_encode_ndjson(models), **kwargs)
@@ -13,8 +13,22 @@ async def get_controller_service(
 ) -> AsyncGenerator[ControllerService, None]:
     """Creates an instance of the auth service"""
 
-    async with create_controller_service(request.app.state.ac_manager, request.app.state.hue_bridge_manager) as service:
+    async with create_controller_service(
+        request.app.state.database, request.app.state.ac_manager, request.app.state.hue_bridge_manager
+    ) as service:
+        yield service
+
+
+async def get_read_only_controller_service(
+    request: Request,
+) -> AsyncGenerator[ControllerService, None]:
+    """Creates an instance of the controller service that may only be used to read from the database"""
+
+    async with create_controller_service(
+        request.app.state.database, request.app.state.ac_manager, request.app.state.hue_bridge_manager, read_only=True
+    ) as service:
         yield service
 
 
 ControllerServiceDep = Annotated[ControllerService, Depends(get_controller_service)]
+ReadOnlyControllerServiceDep = Annotated[ControllerService, Depends(get_read_only_controller_service)]
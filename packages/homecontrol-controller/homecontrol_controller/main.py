@@ -3,6 +3,7 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from homecontrol_base_api.database.core import get_database
 from homecontrol_base_api.exceptions import BaseAPIError, handle_base_api_error
+from homecontrol_base_api.middleware import record_query_stats
 
 from homecontrol_controller.config import settings
 from homecontrol_controller.database.core import ControllerDatabaseSession
@@ -19,23 +20,26 @@ async def lifespan(app: FastAPI):
     # Initialise all devices on startup
     ac_manager = ACManager()
     hue_bridge_manager = HueBridgeManager()
+    # Open the database once so that requests share its connection pool
     async with get_database(ControllerDatabaseSession, settings.database) as database:
-        async with database.start_session() as session:
+        async with database.start_session(read_only=True) as session:
             ac_devices = await session.ac_devices.get_all()
             await ac_manager.add_all(ac_devices)
 
             hue_bridge_devices = await session.hue_bridge_devices.get_all()
             hue_bridge_manager.add_all(hue_bridge_devices)
 
-    app.state.ac_manager = ac_manager
-    app.state.hue_bridge_manager = hue_bridge_manager
+        app.state.database = database
+        app.state.ac_manager = ac_manager
+        app.state.hue_bridge_manager = hue_bridge_manager
 
-    yield
+        yield
 
 
 app = FastAPI(lifespan=lifespan)
 
 app.add_exception_handler(BaseAPIError, handle_base_api_error)
+app.middleware("http")(record_query_stats)
 
 app.include_router(devices)
 app.include_router(rooms)
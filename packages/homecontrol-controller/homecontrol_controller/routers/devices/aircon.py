@@ -1,6 +1,9 @@
-from fastapi import APIRouter, status
+from typing import Annotated, Optional
 
-from homecontrol_controller.dependencies import ControllerServiceDep
+from fastapi import APIRouter, Query, status
+from homecontrol_base_api.responses import NDJSONResponse
+
+from homecontrol_controller.dependencies import ControllerServiceDep, ReadOnlyControllerServiceDep
 from homecontrol_controller.schemas.aircon import (
     ACDevice,
     ACDeviceDiscoveryInfo,
@@ -25,8 +28,24 @@ async def create(ac_device: ACDevicePost, controller_service: ControllerServiceD
 
 
 @aircon.get("", summary="Get a list of AC devices")
-async def get_all(controller_service: ControllerServiceDep) -> list[ACDevice]:
-    return await controller_service.devices.aircon.get_all()
+async def get_all(
+    controller_service: ReadOnlyControllerServiceDep,
+    limit: Annotated[Optional[int], Query(gt=0, le=1000)] = None,
+    after: Optional[str] = None,
+) -> list[ACDevice]:
+    if limit is None:
+        return await controller_service.devices.aircon.get_all()
+    return await controller_service.devices.aircon.get_page(limit, after)
+
+
+@aircon.get(
+    "/stream",
+    summary="Stream all AC devices as newline delimited JSON",
+    response_class=NDJSONResponse,
+    responses={200: {"content": {NDJSONResponse.media_type: {}}}},
+)
+async def stream_all(controller_service: ReadOnlyControllerServiceDep) -> NDJSONResponse:
+    return NDJSONResponse(controller_service.devices.aircon.stream_all())
 
 
 @aircon.get("/{device_id}/state", summary="Get the current state of an AC device")
@@ -1,6 +1,9 @@
-from fastapi import APIRouter, status
+from typing import Annotated, Optional
 
-from homecontrol_controller.dependencies import ControllerServiceDep
+from fastapi import APIRouter, Query, status
+from homecontrol_base_api.responses import NDJSONResponse
+
+from homecontrol_controller.dependencies import ControllerServiceDep, ReadOnlyControllerServiceDep
 from homecontrol_controller.schemas.hue import (
     HueBridgeDevice,
     HueBridgeDeviceDiscoveryInfo,
@@ -26,8 +29,24 @@ async def create(hue_bridge_device: HueBridgeDevicePost, controller_service: Con
 
 
 @hue.get("", summary="Get a list of Hue Bridge devices")
-async def get_all(controller_service: ControllerServiceDep) -> list[HueBridgeDevice]:
-    return await controller_service.devices.hue.get_all_bridges()
+async def get_all(
+    controller_service: ReadOnlyControllerServiceDep,
+    limit: Annotated[Optional[int], Query(gt=0, le=1000)] = None,
+    after: Optional[str] = None,
+) -> list[HueBridgeDevice]:
+    if limit is None:
+        return await controller_service.devices.hue.get_all_bridges()
+    return await controller_service.devices.hue.get_bridges_page(limit, after)
+
+
+@hue.get(
+    "/stream",
+    summary="Stream all Hue Bridge devices as newline delimited JSON",
+    response_class=NDJSONResponse,
+    responses={200: {"content": {NDJSONResponse.media_type: {}}}},
+)
+async def stream_all(controller_service: ReadOnlyControllerServiceDep) -> NDJSONResponse:
+    return NDJSONResponse(controller_service.devices.hue.stream_all_bridges())
 
 
 @hue.get("/{bridge_id}/rooms", summary="Get a list rooms managed by a Hue Bridge")
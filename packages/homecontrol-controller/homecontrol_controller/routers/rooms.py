@@ -1,6 +1,9 @@
-from fastapi import APIRouter, status
+from typing import Annotated, Optional
 
-from homecontrol_controller.dependencies import ControllerServiceDep
+from fastapi import APIRouter, Query, status
+from homecontrol_base_api.responses import NDJSONResponse
+
+from homecontrol_controller.dependencies import ControllerServiceDep, ReadOnlyControllerServiceDep
 from homecontrol_controller.schemas.rooms import Room, RoomPost
 
 rooms = APIRouter(prefix="/rooms", tags=["Rooms"])
@@ -12,5 +15,21 @@ async def create(room: RoomPost, controller_service: ControllerServiceDep) -> Ro
 
 
 @rooms.get("", summary="Get a list of Rooms")
-async def get_all(controller_service: ControllerServiceDep) -> list[Room]:
-    return await controller_service.rooms.get_all()
+async def get_all(
+    controller_service: ReadOnlyControllerServiceDep,
+    limit: Annotated[Optional[int], Query(gt=0, le=1000)] = None,
+    after: Optional[str] = None,
+) -> list[Room]:
+    if limit is None:
+        return await controller_service.rooms.get_all()
+    return await controller_service.rooms.get_page(limit, after)
+
+
+@rooms.get(
+    "/stream",
+    summary="Stream all Rooms as newline delimited JSON",
+    response_class=NDJSONResponse,
+    responses={200: {"content": {NDJSONResponse.media_type: {}}}},
+)
+async def stream_all(controller_service: ReadOnlyControllerServiceDep) -> NDJSONResponse:
+    return NDJSONResponse(controller_service.rooms.stream_all())
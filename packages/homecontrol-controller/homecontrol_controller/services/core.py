@@ -1,9 +1,8 @@
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator, Optional
 
-from homecontrol_base_api.database.core import get_database
+from homecontrol_base_api.database.core import Database
 
-from homecontrol_controller.config import settings
 from homecontrol_controller.database.core import ControllerDatabaseSession
 from homecontrol_controller.devices.aircon.manager import ACManager
 from homecontrol_controller.devices.hue.manager import HueBridgeManager
@@ -46,10 +45,18 @@ class ControllerService:
 
 @asynccontextmanager
 async def create_controller_service(
-    ac_manager: ACManager, hue_bridge_manager: HueBridgeManager
+    database: Database[ControllerDatabaseSession],
+    ac_manager: ACManager,
+    hue_bridge_manager: HueBridgeManager,
+    read_only: bool = False,
 ) -> AsyncGenerator[ControllerService, None]:
-    """Creates an instance of the controller service."""
+    """Creates an instance of the controller service.
 
-    async with get_database(ControllerDatabaseSession, settings.database) as database:
-        async with database.start_session() as session:
-            yield ControllerService(session, ac_manager, hue_bridge_manager)
+    :param database: Database to start the session of the service from.
+    :param ac_manager: AC manager to use.
+    :param hue_bridge_manager: Hue Bridge manager to use.
+    :param read_only: Whether the service will only be used to read from the database.
+    """
+
+    async with database.start_session(read_only=read_only) as session:
+        yield ControllerService(session, ac_manager, hue_bridge_manager)
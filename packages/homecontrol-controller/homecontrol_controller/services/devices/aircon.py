@@ -1,3 +1,5 @@
+from typing import AsyncGenerator, Optional
+
 from pydantic import TypeAdapter
 
 from homecontrol_controller.config import settings
@@ -53,6 +55,22 @@ class ACService:
 
         return TypeAdapter(list[ACDevice]).validate_python(await self._session.get_all())
 
+    async def get_page(self, limit: int, after: Optional[str] = None) -> list[ACDevice]:
+        """Returns a page of AC devices ordered by their IDs.
+
+        :param limit: Maximum number of AC devices to return.
+        :param after: ID of the AC device after which the page should start (the last ID of the previous page).
+        :return: List of AC devices.
+        """
+
+        return TypeAdapter(list[ACDevice]).validate_python(await self._session.get_page(limit, after))
+
+    async def stream_all(self) -> AsyncGenerator[ACDevice, None]:
+        """Yields all AC devices, loading them from the database in batches."""
+
+        async for record in self._session.stream_all():
+            yield ACDevice.model_validate(record)
+
     async def get_state(self, device_id: str) -> ACDeviceState:
         """Obtains an AC device's current state.
 
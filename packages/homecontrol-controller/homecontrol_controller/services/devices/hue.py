@@ -1,3 +1,5 @@
+from typing import AsyncGenerator, Optional
+
 from pydantic import TypeAdapter
 
 from homecontrol_controller.config import settings
@@ -50,6 +52,22 @@ class HueService:
 
         return TypeAdapter(list[HueBridgeDevice]).validate_python(await self._session.get_all())
 
+    async def get_bridges_page(self, limit: int, after: Optional[str] = None) -> list[HueBridgeDevice]:
+        """Returns a page of Hue Bridge devices ordered by their IDs.
+
+        :param limit: Maximum number of Hue Bridge devices to return.
+        :param after: ID of the Hue Bridge device after which the page should start (the last ID of the previous page).
+        :return: List of Hue Bridge devices.
+        """
+
+        return TypeAdapter(list[HueBridgeDevice]).validate_python(await self._session.get_page(limit, after))
+
+    async def stream_all_bridges(self) -> AsyncGenerator[HueBridgeDevice, None]:
+        """Yields all Hue Bridge devices, loading them from the database in batches."""
+
+        async for record in self._session.stream_all():
+            yield HueBridgeDevice.model_validate(record)
+
     async def get_bridge_device(self, bridge_id: str) -> HueBridge:
         """Returns a Hue Bridge device.
 
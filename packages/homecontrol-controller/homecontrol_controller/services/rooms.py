@@ -1,3 +1,5 @@
+from typing import AsyncGenerator, Optional
+
 from pydantic import TypeAdapter
 
 from homecontrol_controller.database.models import RoomInDB
@@ -34,3 +36,19 @@ class RoomService:
         """
 
         return TypeAdapter(list[Room]).validate_python(await self._session.get_all())
+
+    async def get_page(self, limit: int, after: Optional[str] = None) -> list[Room]:
+        """Returns a page of Rooms ordered by their IDs.
+
+        :param limit: Maximum number of Rooms to return.
+        :param after: ID of the Room after which the page should start (the last ID of the previous page).
+        :return: List of Rooms.
+        """
+
+        return TypeAdapter(list[Room]).validate_python(await self._session.get_page(limit, after))
+
+    async def stream_all(self) -> AsyncGenerator[Room, None]:
+        """Yields all Rooms, loading them from the database in batches."""
+
+        async for record in self._session.stream_all():
+            yield Room.model_validate(record)